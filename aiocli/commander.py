@@ -1,17 +1,24 @@
 import asyncio
 import signal
 import sys
-from asyncio import all_tasks, gather, get_event_loop
+from asyncio import all_tasks, gather
 from asyncio.events import AbstractEventLoop
-from typing import Any, Callable, List, Optional, Set, Union
+from typing import Any, Callable, Coroutine, List, Optional, Set, Union
 
 from aiocli.commander_app import (
     Application,
     Command,
     CommandArgument,
     Depends,
+    Hook,
     State,
     command,
+    hook,
+)
+from aiocli.helpers import (
+    LoopFactory,
+    _get_current_event_loop,
+    get_or_create_event_loop,
 )
 
 __all__ = (
@@ -21,6 +28,8 @@ __all__ = (
     'CommandArgument',
     'Command',
     'command',
+    'Hook',
+    'hook',
     'Application',
     # commander
     'run_app',
@@ -67,7 +76,7 @@ class AppRunner:
         exit_code: bool = False,
     ) -> None:
         self._app = app
-        self._loop = loop or get_event_loop()
+        self._loop = loop or get_or_create_event_loop()
         self._handle_signals = handle_signals
         self._exit_code = exit_code
 
@@ -108,7 +117,7 @@ class AppRunner:
 async def _run_app(
     app: Application,
     *,
-    loop: AbstractEventLoop,
+    loop: Optional[AbstractEventLoop] = None,
     handle_signals: bool = True,
     argv: Optional[List[str]] = None,
     exit_code: bool = True,
@@ -124,6 +133,36 @@ async def _run_app(
         await runner.cleanup(all_hooks=all_hooks, ignore_internal_hooks=ignore_internal_hooks)
 
 
+def _run(
+    coro: Coroutine[Any, Any, Any],
+    *,
+    loop: Optional[AbstractEventLoop],
+    loop_factory: Optional[LoopFactory],
+    close_loop: bool,
+) -> Any:
+    runner_cls = getattr(asyncio, 'Runner', None)  # Python 3.11+
+    if loop is None and close_loop and runner_cls is not None:
+        # the runner also shuts down async generators and the default executor, but it unsets the current event
+        # loop of the thread when closing, the previous one is restored for the code running after run_app
+        previous = _get_current_event_loop()
+        try:
+            with runner_cls(loop_factory=loop_factory) as runner:
+                return runner.run(coro)
+        finally:
+            if previous is not None:
+                asyncio.set_event_loop(previous)
+    loop_ = loop or get_or_create_event_loop(loop_factory)
+    try:
+        return loop_.run_until_complete(coro)
+    finally:
+        if not loop_.is_closed():
+            _cancel_tasks(to_cancel=all_tasks(loop=loop_), loop=loop_)
+        if not loop_.is_closed():
+            loop_.run_until_complete(loop_.shutdown_asyncgens())
+        if close_loop and not loop_.is_closed():
+            loop_.close()
+
+
 ApplicationParser = Callable[..., Optional[List[str]]]
 
 
@@ -131,6 +170,7 @@ def run_app(
     app: Union[Application, Callable[[], Application]],
     *,
     loop: Optional[AbstractEventLoop] = None,
+    loop_factory: Optional[LoopFactory] = None,
     handle_signals: bool = True,
     argv: Optional[List[str]] = None,
     exit_code: bool = True,
@@ -140,8 +180,6 @@ def run_app(
     override_return: Optional[bool] = None,
 ) -> Any:
     def wrapper(*args, **kwargs) -> Optional[int]:  # type: ignore
-        loop_ = loop or get_event_loop()
-
         app_ = app if isinstance(app, Application) else app()
 
         if override_return is not None:
@@ -157,24 +195,20 @@ def run_app(
 
         response: Any = None
         try:
-            response = loop_.run_until_complete(
+            response = _run(
                 _run_app(
                     app_,
-                    loop=loop_,
+                    loop=loop,
                     handle_signals=handle_signals,
                     argv=argv if parser is None else parser(*args, **kwargs),
                     exit_code=exit_code,
-                )
+                ),
+                loop=loop,
+                loop_factory=loop_factory,
+                close_loop=close_loop,
             )
         except (GracefulExit, KeyboardInterrupt):  # pragma: no cover
             pass
-        finally:
-            if not loop_.is_closed():
-                _cancel_tasks(to_cancel=all_tasks(loop=loop_), loop=loop_)
-            if not loop_.is_closed():
-                loop_.run_until_complete(loop_.shutdown_asyncgens())
-            if close_loop and not loop_.is_closed():
-                loop_.close()
 
         return response if app_.get_override_return() else app_.exit_code
 
@@ -1,38 +1,79 @@
+import sys
 from abc import ABC, abstractmethod
 from argparse import Action, ArgumentParser, RawTextHelpFormatter
-from asyncio import iscoroutinefunction
-from dataclasses import dataclass, field
-from inspect import signature
+from asyncio import (
+    Future,
+    TimeoutError,
+    ensure_future,
+    gather,
+    get_running_loop,
+    iscoroutinefunction,
+    shield,
+    wait_for,
+)
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import (
+    AsyncExitStack,
+    asynccontextmanager,
+    contextmanager,
+)
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from functools import partial
+from logging import DEBUG
+from time import monotonic, perf_counter
+from types import TracebackType
 from typing import (
     Any,
+    AsyncContextManager,
+    AsyncIterator,
     Awaitable,
     Callable,
     Container,
     Coroutine,
     Dict,
+    Iterator,
     List,
+    Literal,
     NamedTuple,
     Optional,
     Sequence,
+    Set,
     Tuple,
     Type,
     Union,
     cast,
 )
+from warnings import warn
 
 __all__ = (
     # commander_app
     'State',
     'Depends',
+    'DependencyScope',
+    'ExecutionPolicy',
     'CommandArgument',
     'Command',
     'command',
     'CommandHandler',
+    'CommandAroundMiddleware',
     'Application',
     'InternalCommandHook',
+    'Hook',
+    'hook',
+    'ApplicationHook',
 )
 
-from .helpers import resolve_coroutine, resolve_function
+from .commander_cache import CachedResult, CommandCache, _capture_output
+from .commander_stream import OutputFormat, get_formatter, stream_records
+from .helpers import (
+    CompiledFunction,
+    _run_in_executor,
+    compile_function,
+    import_reference,
+    resolve_coroutine,
+)
 from .logger import logger
 
 CommandHandler = Callable[
@@ -48,15 +89,171 @@ class State(Dict[Any, Any]):
     pass
 
 
+DependencyScope = Literal['invocation', 'application']
+
+# where synchronous callables run: on the event loop, in a thread pool or, only for command handlers, in a process pool
+ExecutionPolicy = Literal['inline', 'thread', 'process']
+
+
 # dataclass
 class _Depends:
-    def __init__(self, dependency: Callable[..., Any], cache: bool) -> None:
+    def __init__(
+        self,
+        dependency: Callable[..., Any],
+        cache: bool,
+        scope: DependencyScope = 'application',
+        ttl: Optional[float] = None,
+        pool_size: Optional[int] = None,
+    ) -> None:
+        if scope not in ('invocation', 'application'):
+            raise ValueError('Invalid dependency scope "{0}"'.format(scope))
         self.dependency = dependency
         self.cache = cache
+        self.scope = scope
+        self.ttl = ttl
+        self.pool_size = pool_size
+
+
+def Depends(
+    dependency: Callable[..., Any],
+    cache: bool = True,
+    scope: DependencyScope = 'application',  # only when cache is enabled
+    ttl: Optional[float] = None,  # seconds, only for application scope
+    pool_size: Optional[int] = None,  # idle resources kept between invocations, see _DependenciesPool
+) -> Any:
+    return _Depends(dependency=dependency, cache=cache, scope=scope, ttl=ttl, pool_size=pool_size)
+
+
+_missing = object()
+
+
+class _DependenciesCache:
+    def __init__(self, maxsize: Optional[int] = None) -> None:
+        self._maxsize = maxsize
+        self._entries: 'OrderedDict[Any, Tuple[Any, Optional[float]]]' = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        entry = self._entries.get(key, None)
+        if entry is None:
+            return _missing
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= monotonic():
+            del self._entries[key]
+            return _missing
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (value, None if ttl is None else monotonic() + ttl)
+        self._entries.move_to_end(key)
+        if self._maxsize is not None:
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)  # least recently used
+
+    def invalidate(self, keys: Sequence[Any] = ()) -> None:
+        if not keys:
+            self._entries.clear()
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key) is not _missing
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_PooledResource = Tuple[Any, AsyncContextManager[Any]]
+
+
+class _DependenciesPool:
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._idle: List[_PooledResource] = []
+
+    async def acquire(self, create: Callable[[], AsyncContextManager[Any]]) -> _PooledResource:
+        if self._idle:
+            return self._idle.pop()
+        manager = create()
+        return await manager.__aenter__(), manager
+
+    async def release(self, resource: _PooledResource, discard: bool = False) -> None:
+        if discard or len(self._idle) >= self._size:
+            await resource[1].__aexit__(None, None, None)
+        else:
+            self._idle.append(resource)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, manager in idle:
+            await manager.__aexit__(None, None, None)
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+
+class _CommandTrie:
+    # command names are paths of words ("calculator div"), each word is a node
+    def __init__(self) -> None:
+        self._children: Dict[str, '_CommandTrie'] = {}
+        self._command: Optional[str] = None
+
+    def insert(self, name: str) -> None:
+        node = self
+        for word in name.split(' '):
+            node = node._children.setdefault(word, _CommandTrie())
+        node._command = name
+
+    def route(self, args: Sequence[str], abbreviations: bool = False) -> Tuple[Optional[str], int]:
+        # deepest command matching the leading args and how many args it takes, O(depth)
+        node, name, depth = self, None, 0
+        for position, arg in enumerate(args):
+            child = node._children.get(arg, None)
+            if child is None and abbreviations and not arg.startswith('-'):
+                matches = [child_ for word, child_ in node._children.items() if word.startswith(arg)]
+                child = matches[0] if len(matches) == 1 else None  # only unambiguous prefixes
+            if child is None:
+                break
+            node = child
+            if node._command is not None:
+                name, depth = node._command, position + 1
+        return name, depth
+
+
+def _reference(func: Callable[..., Any]) -> str:
+    # stable between processes, unlike repr
+    qualname = getattr(func, '__qualname__', type(func).__qualname__)
+    return '{0}:{1}'.format(getattr(func, '__module__', ''), qualname)
+
+
+@asynccontextmanager
+async def _dependency_context(
+    function: CompiledFunction, kwargs: Dict[str, Any], executor: Optional[Executor] = None
+) -> AsyncIterator[Any]:
+    if function.is_async_generator:
+        async with asynccontextmanager(function.func)(**kwargs) as value:
+            yield value
+    elif function.is_generator:
+        # setup and teardown run where the execution policy says, like the other synchronous dependencies
+        manager = contextmanager(function.func)(**kwargs)
+        value = await _run_in_executor(executor, manager.__enter__)
+        try:
+            yield value
+        except BaseException as err:
+            if not await _run_in_executor(executor, manager.__exit__, type(err), err, err.__traceback__):
+                raise
+        else:
+            await _run_in_executor(executor, manager.__exit__, None, None, None)
+    else:
+        yield await function.call_in_executor(executor, **kwargs)
 
 
-def Depends(dependency: Callable[..., Any], cache: bool = True) -> Any:
-    return _Depends(dependency=dependency, cache=cache)
+async def _iterate_in_executor(executor: Optional[Executor], records: Iterator[Any]) -> AsyncIterator[Any]:
+    while True:
+        record = await _run_in_executor(executor, next, records, _missing)
+        if record is _missing:
+            return
+        yield record
 
 
 # https://docs.python.org/3/library/argparse.html#the-add-argument-method
@@ -93,7 +290,7 @@ class CommandArgument(NamedTuple):
 @dataclass
 class Command:
     name: str
-    handler: CommandHandler
+    handler: Union[CommandHandler, str]  # or "package.module:handler", imported the first time it is dispatched
     positionals: List[
         Union[
             Tuple[str, Dict[str, Any]],
@@ -111,6 +308,11 @@ class Command:
     usage: Optional[str] = None
     ignore_hooks: bool = False
     ignore_middleware: bool = False
+    execution_policy: Optional[ExecutionPolicy] = None  # None means the application default
+    timeout: Optional[float] = None  # seconds, None means the application default
+    timeout_exit_code: Optional[int] = None  # None means the application default
+    cache: Optional[CommandCache] = None  # memoizes successful results on disk, see CommandCache
+    output_format: OutputFormat = 'jsonl'  # of the records yielded by (async) generator handlers
 
     def should_ignore_internal_hooks(self) -> bool:
         return self.ignore_hooks and self.name in ['-h', '--help', '-v', '--version']
@@ -121,7 +323,7 @@ class Command:
 
 def command(
     name: str,
-    handler: CommandHandler,
+    handler: Union[CommandHandler, str],
     positionals: Optional[
         List[
             Union[
@@ -141,6 +343,11 @@ def command(
     deprecated: Optional[bool] = None,
     description: Optional[str] = None,
     usage: Optional[str] = None,
+    execution_policy: Optional[ExecutionPolicy] = None,
+    timeout: Optional[float] = None,
+    timeout_exit_code: Optional[int] = None,
+    cache: Optional[CommandCache] = None,
+    output_format: OutputFormat = 'jsonl',
 ) -> Command:
     return Command(
         name=name,
@@ -150,11 +357,19 @@ def command(
         deprecated=deprecated,
         description=description,
         usage=usage,
+        execution_policy=execution_policy,
+        timeout=timeout,
+        timeout_exit_code=timeout_exit_code,
+        cache=cache,
+        output_format=output_format,
     )
 
 
 CommandMiddleware = Callable[[Command, Dict[str, Any], 'Application'], Union[None, Coroutine[Any, Any, None]]]
 
+# async def middleware(cmd, kwargs, call_next), returns the response of call_next() or its own to short-circuit
+CommandAroundMiddleware = Callable[[Command, Dict[str, Any], Callable[[], Awaitable[Any]]], Awaitable[Any]]
+
 CommandExceptionHandler = Callable[
     [BaseException, Command, Dict[str, Any]], Union[Optional[int], Coroutine[Any, Any, Optional[int]]]
 ]
@@ -178,6 +393,21 @@ class InternalCommandHook(ABC):
         pass
 
 
+@dataclass
+class Hook:
+    handler: CommandHook
+    name: Optional[str] = None  # None means the handler name, hooks sharing a name form a group
+    after: Sequence[str] = ()  # names (or groups) of the hooks that have to finish first, "*" means all before
+
+
+def hook(handler: CommandHook, *, name: Optional[str] = None, after: Optional[Sequence[str]] = None) -> Hook:
+    return Hook(handler=handler, name=name, after=after or ())
+
+
+# plain hooks run one after another, Hook instances run concurrently unless they declare what they come after
+ApplicationHook = Union[CommandHook, Hook]
+
+
 _yellow_color = '\033[93m'
 _green_color = '\033[92m'
 _close_color = '\033[00m'
@@ -188,6 +418,7 @@ class _ApplicationDescription:
     default_router: List[Command]
     routers: Dict[str, List[Command]]
     color: bool
+    stale: bool = False  # whether the main parser description must be rendered again
 
     def _get_commands(self) -> List[Command]:
         commands = [*self.default_router]
@@ -237,6 +468,15 @@ class _ApplicationDescription:
         )
 
 
+class ApplicationArgumentParser(ArgumentParser):
+    before_format_help: Optional[Callable[[], None]] = None
+
+    def format_help(self) -> str:
+        if self.before_format_help:
+            self.before_format_help()
+        return super().format_help()
+
+
 class ApplicationHelpFormatter(RawTextHelpFormatter):
     color: bool
 
@@ -252,20 +492,96 @@ class ApplicationHelpFormatter(RawTextHelpFormatter):
 ApplicationRawInput = Tuple[Tuple[Any, ...], Dict[str, Any]]
 
 
+class _DependencyPlan(NamedTuple):
+    depends: _Depends
+    function: CompiledFunction
+    parameters: Tuple['_ParameterPlan', ...]
+
+
+class _ParameterPlan(NamedTuple):
+    name: str
+    default: Any
+    dependency: Optional[_DependencyPlan]
+    state: bool
+
+
+class _MiddlewarePlan(NamedTuple):
+    function: CompiledFunction
+    parameters_count: int
+
+
+class _LogJoin(NamedTuple):
+    values: Sequence[Any]
+
+    def __str__(self) -> str:
+        return ', '.join([str(value) for value in self.values])
+
+
+class _LogKwargs(NamedTuple):
+    kwargs: Dict[str, Any]
+
+    def __str__(self) -> str:
+        return ', '.join(['{0}={1}'.format(key, val) for key, val in self.kwargs.items()])
+
+
+@dataclass
+class _CommandInvocation:
+    app: 'Application'
+    exit_code: int
+    raw_input: ApplicationRawInput
+    resolving: Dict[Any, 'Future[Any]'] = field(default_factory=dict)  # invocation scoped dependencies
+    executor: Optional[Executor] = None  # for synchronous middleware and dependencies
+    exit_stack: AsyncExitStack = field(default_factory=AsyncExitStack)  # dependencies teardown
+    deadline: Optional[float] = None  # monotonic time
+    failed: bool = False  # the command raised, even if an exception handler answered
+
+
+_current_invocation: ContextVar[Optional[_CommandInvocation]] = ContextVar('aiocli_invocation', default=None)
+
+
+def _get_current_invocation(app: 'Application') -> Optional[_CommandInvocation]:
+    invocation = _current_invocation.get()
+    return invocation if invocation and invocation.app is app else None
+
+
+_CommandPipeline = Callable[['_CommandPlan', Dict[str, Any], _CommandInvocation], Awaitable[Any]]
+
+
+class _CommandPlan(NamedTuple):
+    command: Command
+    execution_policy: ExecutionPolicy
+    handler: CompiledFunction
+    parameters: Tuple[_ParameterPlan, ...]
+    before_middleware: Tuple[_MiddlewarePlan, ...]
+    after_middleware: Tuple[_MiddlewarePlan, ...]
+    timeout: Optional[float]
+    timeout_exit_code: int
+    pipeline: _CommandPipeline  # around middleware wrapping before middleware, handler and after middleware
+
+
 class Application:
-    _parser: ArgumentParser
+    _parser: ApplicationArgumentParser
     _parsers: Dict[str, ArgumentParser]
     _debug: bool
     _commands: Dict[str, Command]
     _exit_code: int
+    _default_exit_code: int
     _before_middleware: List[CommandMiddleware]
     _after_middleware: List[CommandMiddleware]
+    _around_middleware: List[CommandAroundMiddleware]
     _exception_handlers: Dict[Type[BaseException], CommandExceptionHandler]
-    _on_startup: List[CommandHook]
-    _on_shutdown: List[CommandHook]
-    _on_cleanup: List[CommandHook]
+    _on_startup: List[ApplicationHook]
+    _on_shutdown: List[ApplicationHook]
+    _on_cleanup: List[ApplicationHook]
     _deprecated: bool
-    _dependencies_cached: Dict[Any, Any]
+    _dependencies_cached: _DependenciesCache
+    _dependencies_resolving: Dict[Any, 'Future[Any]']
+    _dependencies_pools: Dict[Any, _DependenciesPool]
+    _execution_policy: ExecutionPolicy
+    _max_workers: Optional[int]
+    _executors: Dict[ExecutionPolicy, Executor]
+    _timeout: Optional[float]
+    _timeout_exit_code: int
     _app_state: Optional[State]
     _app_state_resolver: Optional[ArgumentParser]
     _default_command: str
@@ -274,6 +590,10 @@ class Application:
     _color: bool
     _raw_input: ApplicationRawInput
     _override_return: bool
+    _plans: Dict[str, _CommandPlan]
+    _compiled_functions: Dict[int, Tuple[Any, CompiledFunction]]
+    _routes: _CommandTrie
+    _abbreviations: bool
 
     def __init__(
         self,
@@ -286,10 +606,11 @@ class Application:
         default_exit_code: int = 0,
         middleware: Optional[Sequence[CommandMiddleware]] = None,
         after_middleware: Optional[Sequence[CommandMiddleware]] = None,
+        around_middleware: Optional[Sequence[CommandAroundMiddleware]] = None,
         exception_handlers: Optional[Dict[Type[BaseException], CommandExceptionHandler]] = None,
-        on_startup: Optional[Sequence[CommandHook]] = None,
-        on_shutdown: Optional[Sequence[CommandHook]] = None,
-        on_cleanup: Optional[Sequence[CommandHook]] = None,
+        on_startup: Optional[Sequence[ApplicationHook]] = None,
+        on_shutdown: Optional[Sequence[ApplicationHook]] = None,
+        on_cleanup: Optional[Sequence[ApplicationHook]] = None,
         deprecated: Optional[bool] = None,
         state: Optional[ArgumentState] = None,
         default_command: Optional[str] = None,
@@ -297,6 +618,12 @@ class Application:
         use_print_for_logging: bool = False,
         color: bool = True,
         override_return: bool = False,  # if False CommandHandler output will be taken as exit code
+        dependencies_cache_size: Optional[int] = None,  # None means unbounded
+        execution_policy: ExecutionPolicy = 'inline',
+        max_workers: Optional[int] = None,  # of the thread and process pools
+        timeout: Optional[float] = None,  # seconds, per command invocation
+        timeout_exit_code: int = 124,  # same as coreutils timeout
+        abbreviations: bool = False,  # whether unambiguous prefixes of command words are accepted
     ) -> None:
         self._raw_input = (
             (),
@@ -311,12 +638,13 @@ class Application:
         class InternalApplicationHelpFormatter(ApplicationHelpFormatter):
             color = self._color
 
-        self._parser = ArgumentParser(
+        self._parser = ApplicationArgumentParser(
             description=description,
             prog=title,
             formatter_class=InternalApplicationHelpFormatter,
             usage='{0} [-h] [--version]{1}'.format(title, '\n\n  {0}'.format(description) if description else ''),
         )
+        self._parser.before_format_help = self._render_main_parser_description
         self._update_parser_help(self._parser, cast(str, self.parser.usage))
         self._parser.add_argument('--version', action='version', version=version)
         self._parsers = {
@@ -340,77 +668,263 @@ class Application:
             '-v': self_command('-v'),
             '--version': self_command('--version'),
         }
+        self._deprecated = bool(deprecated)
+        self._description = _ApplicationDescription(default_router=[*self._commands.values()], routers={}, color=color)
+        self._plans = {}  # lazy, see _get_command_plan
+        self._compiled_functions = {}
+        self._routes = _CommandTrie()
+        for name in self._commands:
+            self._routes.insert(name)
+        self._abbreviations = abbreviations
         self.add_commands([] if commands is None else commands)
         self._default_command = default_command or '-h'
-        self._exit_code = default_exit_code
+        self._exit_code = default_exit_code  # last finished invocation
+        self._default_exit_code = default_exit_code
         self._before_middleware = [] if middleware is None else list(middleware)
         self._after_middleware = [] if after_middleware is None else list(after_middleware)
+        self._around_middleware = [] if around_middleware is None else list(around_middleware)
         self._exception_handlers = {} if exception_handlers is None else exception_handlers
         self._on_startup = [] if on_startup is None else list(on_startup)
         self._on_shutdown = [] if on_shutdown is None else list(on_shutdown)
         self._on_cleanup = [] if on_cleanup is None else list(on_cleanup)
-        self._deprecated = bool(deprecated)
-        self._dependencies_cached = {}
-        self._description = _ApplicationDescription(default_router=[*self._commands.values()], routers={}, color=color)
+        self._dependencies_cached = _DependenciesCache(maxsize=dependencies_cache_size)
+        self._dependencies_resolving = {}  # application scoped dependencies being created, shared by invocations
+        self._dependencies_pools = {}
+        self._execution_policy = execution_policy
+        self._max_workers = max_workers
+        self._executors = {}  # lazy, see _get_executor
+        self._timeout = timeout
+        self._timeout_exit_code = timeout_exit_code
         self.include_routers([] if routers is None else routers)
 
-    async def __call__(self, args: List[str]) -> Any:
-        response: Any = self._exit_code
+    async def __call__(self, args: List[str], *, raw_input: Optional[ApplicationRawInput] = None) -> Any:
+        # every call gets its own context, so concurrent calls on the same application do not race each other
+        invocation = _CommandInvocation(
+            app=self,
+            exit_code=self._default_exit_code,
+            raw_input=self._raw_input if raw_input is None else raw_input,
+        )
+        token = _current_invocation.set(invocation)
+        response: Any = invocation.exit_code
         try:
-            response = await self._execute_command(
-                name=args[0] if len(args) > 0 else self._default_command,
-                args=args[1:],
-            )
+            name, args = self._route_command(args)
+            response = await self._execute_command(name=name, args=args, invocation=invocation)
         except SystemExit as err:
             response = err.code
         finally:
+            _current_invocation.reset(token)
             if not self._override_return and isinstance(response, int) and 0 <= response <= 255:
-                self._exit_code = response
-        return response if self._override_return else self._exit_code
+                invocation.exit_code = response
+            self._exit_code = invocation.exit_code
+        return response if self._override_return else invocation.exit_code
+
+    def _route_command(self, args: List[str]) -> Tuple[str, List[str]]:
+        if not args:
+            return self._default_command, []
+        name, depth = self._routes.route(args, self._abbreviations)
+        if name is None:
+            return args[0], args[1:]
+        return name, args[depth:]
 
     def _ensure_command_exists(self, name: str) -> None:
-        if name not in self._parsers:
+        if name not in self._commands:
             if name:
-                self._log(msg='{0}Command got "{1}".'.format('[deprecated] ' if self._deprecated else '', name))
+                self._log('{0}Command got "{1}".', '[deprecated] ' if self._deprecated else '', name)
             raise SystemExit('Missing command')
-        self._log(msg='{0}Command got "{1}".'.format('[deprecated] ' if self._deprecated else '', name))
-        self._log(
-            msg='{0}Handler got "{1}".'.format(
-                '[deprecated] ' if self._deprecated else '', self._commands[name].handler.__name__
+        if self._debug:
+            self._log('{0}Command got "{1}".', '[deprecated] ' if self._deprecated else '', name)
+            self._log(
+                '{0}Handler got "{1}".',
+                '[deprecated] ' if self._deprecated else '',
+                getattr(self._commands[name].handler, '__name__', self._commands[name].handler),
             )
-        )
 
-    async def _execute_command(self, name: str, args: List[str]) -> Any:
+    async def _execute_command(self, name: str, args: List[str], invocation: _CommandInvocation) -> Any:
         self._ensure_command_exists(name=name)
-        kwargs = await self._resolve_command_handler_args(name, args)
-        kwargs = await self._resolve_command_handler_kwargs(self._commands[name].handler, kwargs)
+        plan = self._get_command_plan(name)
+        invocation.executor = self._get_executor(plan.execution_policy)
+        async with invocation.exit_stack:
+            kwargs = await self._resolve_command_handler_args(name, args)
+            if plan.command.cache is None:
+                return await self._execute_command_with_deadline(plan, kwargs, invocation)
+            return await self._execute_cached_command(plan.command.cache, plan, kwargs, invocation)
+
+    async def _execute_command_with_deadline(
+        self, plan: _CommandPlan, kwargs: Dict[str, Any], invocation: _CommandInvocation
+    ) -> Any:
+        if plan.timeout is None:
+            return await self._execute_command_plan(plan, kwargs, invocation)
+        # the deadline covers dependencies, middleware and handler, work already offloaded to a pool keeps running
+        invocation.deadline = monotonic() + plan.timeout
+        try:
+            return await wait_for(self._execute_command_plan(plan, kwargs, invocation), timeout=plan.timeout)
+        except TimeoutError:
+            if monotonic() < invocation.deadline:
+                raise  # raised by the command itself, e.g. its own wait_for
+            self._log('Command "{0}" timed out after {1} seconds.', plan.command.name, plan.timeout)
+            invocation.failed = True
+            return plan.timeout_exit_code
+
+    async def _execute_cached_command(
+        self, cache: CommandCache, plan: _CommandPlan, kwargs: Dict[str, Any], invocation: _CommandInvocation
+    ) -> Any:
+        loop = get_running_loop()
+        key = await loop.run_in_executor(
+            None,
+            partial(cache.key, plan.command.name, kwargs, app=self._parser.prog, handler=_reference(plan.handler.func)),
+        )
+        result = await loop.run_in_executor(None, cache.load, key)
+        if result is not None:
+            self._log('Command "{0}" result found in cache ({1}).', plan.command.name, key)
+            sys.stdout.write(result.stdout)
+            sys.stderr.write(result.stderr)
+            return result.response
+        # output of this invocation only, other commands may be running concurrently
+        with _capture_output() as (stdout, stderr):
+            response = await self._execute_command_with_deadline(plan, kwargs, invocation)
+        if invocation.failed or (isinstance(response, int) and response != 0):
+            return response  # failures are not cached, including the ones answered by exception handlers
+        result = CachedResult(response=response, stdout=stdout.getvalue(), stderr=stderr.getvalue())
+        await loop.run_in_executor(None, cache.store, key, result)
+        return response
+
+    async def _execute_command_plan(
+        self, plan: _CommandPlan, kwargs: Dict[str, Any], invocation: _CommandInvocation
+    ) -> Any:
+        kwargs = await self._resolve_command_handler_kwargs(plan, kwargs, invocation)
         try:
-            await self._execute_command_middleware(self._before_middleware, self._commands[name], kwargs)
-            response = await self._execute_command_handler(self._commands[name].handler, kwargs)
-            await self._execute_command_middleware(self._after_middleware, self._commands[name], kwargs)
-            return response
+            return await plan.pipeline(plan, kwargs, invocation)
         except BaseException as err:
-            return await self._execute_command_exception_handler(err, self._commands[name], kwargs)
+            invocation.failed = True
+            return await self._execute_command_exception_handler(err, plan.command, kwargs, invocation.executor)
+
+    async def _execute_command_pipeline(
+        self, plan: _CommandPlan, kwargs: Dict[str, Any], invocation: _CommandInvocation
+    ) -> Any:
+        await self._execute_command_middleware(plan.before_middleware, plan.command, kwargs, invocation.executor)
+        response: Any = None
+        if plan.handler.is_generator or plan.handler.is_async_generator:
+            await self._stream_command_handler(plan.handler, kwargs, plan.command.output_format, invocation.executor)
+        else:
+            response = await self._execute_command_handler(
+                plan.handler, kwargs, self._get_executor(plan.execution_policy, handler=True)
+            )
+        await self._execute_command_middleware(plan.after_middleware, plan.command, kwargs, invocation.executor)
+        return response
+
+    def _get_command_plan(self, name: str) -> _CommandPlan:
+        plan = self._plans.get(name, None)
+        if plan is None:
+            cmd = self._commands[name]
+            if isinstance(cmd.handler, str):
+                cmd.handler = cast(CommandHandler, import_reference(cmd.handler))
+            handler = self._compile_function(cmd.handler)
+            plan = _CommandPlan(
+                command=cmd,
+                execution_policy=cmd.execution_policy or self._execution_policy,
+                handler=handler,
+                parameters=self._compile_parameters(handler),
+                before_middleware=tuple([self._compile_middleware(mw) for mw in self._before_middleware]),
+                after_middleware=tuple([self._compile_middleware(mw) for mw in self._after_middleware]),
+                timeout=self._timeout if cmd.timeout is None else cmd.timeout,
+                timeout_exit_code=self._timeout_exit_code if cmd.timeout_exit_code is None else cmd.timeout_exit_code,
+                pipeline=self._compile_pipeline(cmd),
+            )
+            self._plans[name] = plan
+        return plan
+
+    def _compile_function(self, func: Callable[..., Any]) -> CompiledFunction:
+        owner = func
+        if isinstance(func, InternalCommandHook):
+            func = func.__call__
+        compiled = self._compiled_functions.get(id(owner), None)
+        if compiled is None or compiled[0] is not owner:
+            compiled = (owner, compile_function(func))
+            self._compiled_functions[id(owner)] = compiled
+        return compiled[1]
+
+    def _compile_pipeline(self, cmd: Command) -> _CommandPipeline:
+        # the onion is built once per command, the first around middleware is the outermost layer
+        pipeline: _CommandPipeline = self._execute_command_pipeline
+        if cmd.should_ignore_middleware():
+            return pipeline
+        for middleware in reversed(self._around_middleware):
+            pipeline = self._compile_around_middleware(self._compile_function(middleware), pipeline)
+        return pipeline
+
+    def _compile_around_middleware(self, middleware: CompiledFunction, call: _CommandPipeline) -> _CommandPipeline:
+        if not middleware.is_coroutine:
+            raise TypeError('Around middleware "{0}" must be a coroutine function'.format(middleware.func))
+
+        async def pipeline(plan: _CommandPlan, kwargs: Dict[str, Any], invocation: _CommandInvocation) -> Any:
+            self._log(
+                'Executing around middleware {0} with {1}({2})...',
+                type(middleware.func),
+                type(plan.command),
+                _LogKwargs(kwargs),
+            )
+            return await middleware.func(plan.command, kwargs, partial(call, plan, kwargs, invocation))
+
+        return pipeline
+
+    def _compile_middleware(self, middleware: CommandMiddleware) -> _MiddlewarePlan:
+        function = self._compile_function(middleware)
+        return _MiddlewarePlan(function=function, parameters_count=len(function.parameters))
+
+    def _compile_parameters(self, function: CompiledFunction) -> Tuple[_ParameterPlan, ...]:
+        return tuple(
+            [
+                _ParameterPlan(
+                    name=param.name,
+                    default=param.default,
+                    dependency=(
+                        self._compile_dependency(param.default) if isinstance(param.default, _Depends) else None
+                    ),
+                    state=isinstance(param.annotation, State)
+                    or (isinstance(param.annotation, type) and issubclass(param.annotation, State)),
+                )
+                for param in function.parameters
+            ]
+        )
 
-    def include_router(self, router: 'Application') -> None:
-        for name, cmd in router._commands.items():
-            if name not in self._commands:
+    def _compile_dependency(self, depends: _Depends) -> _DependencyPlan:
+        function = self._compile_function(depends.dependency)
+        return _DependencyPlan(depends=depends, function=function, parameters=self._compile_parameters(function))
+
+    def include_router(self, router: 'Application', prefix: Optional[str] = None) -> None:
+        self.include_routers(routers=[router], prefix=prefix)
+
+    def include_routers(self, routers: Sequence['Application'], prefix: Optional[str] = None) -> None:
+        # with a prefix, "div" of the router is dispatched as "prefix div"
+        if not routers:
+            return
+        for router in routers:
+            for name, cmd in router._commands.items():
+                if name in ['-h', '--help', '-v', '--version']:
+                    continue
+                if prefix:
+                    name = '{0} {1}'.format(prefix, name)
+                    cmd = replace(cmd, name=name)
+                if name in self._commands:
+                    warn(
+                        'Command "{0}" of router "{1}" is already registered, ignored'.format(name, router._parser.prog)
+                    )
+                    continue
                 if cmd.deprecated is None:
                     cmd.deprecated = self._deprecated
                 self._commands[name] = cmd
-                self._parsers[name] = router._parsers[name]
-                self._update_main_parser_description(router._parser, cmd)
-        self._before_middleware.extend(router._before_middleware)
-        self._after_middleware.extend(router._after_middleware)
-        self._exception_handlers.update(router._exception_handlers)
-        self._on_startup.extend(router._on_startup)
-        self._on_shutdown.extend(router._on_shutdown)
-        self._on_cleanup.extend(router.on_cleanup)
-        self._render_parser()
-
-    def include_routers(self, routers: Sequence['Application']) -> None:
+                self._routes.insert(name)
+                self._describe_command(router._parser, cmd)
+        self._before_middleware.extend([mw for router in routers for mw in router._before_middleware])
+        self._after_middleware.extend([mw for router in routers for mw in router._after_middleware])
+        self._around_middleware.extend([mw for router in routers for mw in router._around_middleware])
         for router in routers:
-            self.include_router(router=router)
+            self._exception_handlers.update(router._exception_handlers)
+        self._on_startup.extend([hook for router in routers for hook in router._on_startup])
+        self._on_shutdown.extend([hook for router in routers for hook in router._on_shutdown])
+        self._on_cleanup.extend([hook for router in routers for hook in router._on_cleanup])
+        self._description.stale = True  # lazy, rendered once, see _render_main_parser_description
+        self._plans.clear()
 
     def command(
         self,
@@ -436,6 +950,11 @@ class Application:
         description: Optional[str] = None,
         usage: Optional[str] = None,
         ignore_hooks: bool = False,
+        execution_policy: Optional[ExecutionPolicy] = None,
+        timeout: Optional[float] = None,
+        timeout_exit_code: Optional[int] = None,
+        cache: Optional[CommandCache] = None,
+        output_format: OutputFormat = 'jsonl',
     ) -> Callable[[CommandHandler], CommandHandler]:
         def decorator(handler: CommandHandler) -> CommandHandler:
             self._add_command(
@@ -448,6 +967,11 @@ class Application:
                     description=description,
                     usage=usage,
                     ignore_hooks=ignore_hooks,
+                    execution_policy=execution_policy,
+                    timeout=timeout,
+                    timeout_exit_code=timeout_exit_code,
+                    cache=cache,
+                    output_format=output_format,
                 )
             )
             return handler
@@ -457,7 +981,7 @@ class Application:
     def _get_command_from_args(self, args: List[str]) -> Optional[Command]:
         cmd: Optional[Command] = None
         if len(args) > 0:
-            cmd = self.get_command(name=args[0])
+            cmd = self.get_command(name=self._route_command(args)[0])
         if not cmd:
             cmd = self.get_command(name=self._default_command)
         return cmd
@@ -477,8 +1001,20 @@ class Application:
     def get_command(self, name: str) -> Optional[Command]:
         return self._commands.get(name, None)
 
+    @property
+    def commands(self) -> List[Command]:
+        return list(self._commands.values())
+
+    @property
+    def default_command(self) -> str:
+        return self._default_command
+
     def get_parser(self, command_name: str) -> Optional[ArgumentParser]:
-        return self._parsers.get(command_name, None)
+        parser = self._parsers.get(command_name, None)
+        if parser is None and command_name in self._commands:
+            parser = self._build_parser(self._commands[command_name])
+            self._parsers[command_name] = parser
+        return parser
 
     def middleware(self, after: bool = False) -> Callable[[CommandMiddleware], CommandMiddleware]:
         def decorator(middleware: CommandMiddleware) -> CommandMiddleware:
@@ -492,6 +1028,18 @@ class Application:
             self._after_middleware.extend(middleware)
         else:
             self._before_middleware.extend(middleware)
+        self._plans.clear()
+
+    def around_middleware(self) -> Callable[[CommandAroundMiddleware], CommandAroundMiddleware]:
+        def decorator(middleware: CommandAroundMiddleware) -> CommandAroundMiddleware:
+            self.add_around_middleware(middleware=[middleware])
+            return middleware
+
+        return decorator
+
+    def add_around_middleware(self, middleware: Sequence[CommandAroundMiddleware]) -> None:
+        self._around_middleware.extend(middleware)
+        self._plans.clear()
 
     def exception_handler(
         self,
@@ -509,6 +1057,9 @@ class Application:
     def get_exception_handler(self, typ: Type[BaseException]) -> Optional[CommandExceptionHandler]:
         return self._exception_handlers.get(typ, None)
 
+    def invalidate_dependencies(self, *dependencies: Callable[..., Any]) -> None:  # all of them if none given
+        self._dependencies_cached.invalidate(dependencies)
+
     @property
     def parser(self) -> ArgumentParser:
         return self._parser
@@ -538,31 +1089,59 @@ class Application:
 
     @property
     def exit_code(self) -> int:
-        return self._exit_code
+        invocation = _get_current_invocation(self)
+        return invocation.exit_code if invocation else self._exit_code
 
     def exit(self) -> None:
         self._parser.exit(status=self._exit_code)
 
     @property
-    def on_startup(self) -> List[CommandHook]:
+    def on_startup(self) -> List[ApplicationHook]:
         return self._on_startup
 
     async def startup(self, all_hooks: bool = True, ignore_internal_hooks: bool = False) -> None:
         await self._execute_command_hooks(self.on_startup, all_hooks, ignore_internal_hooks)
 
     @property
-    def on_shutdown(self) -> List[CommandHook]:
+    def on_shutdown(self) -> List[ApplicationHook]:
         return self._on_shutdown
 
     async def shutdown(self, all_hooks: bool = True, ignore_internal_hooks: bool = False) -> None:
         await self._execute_command_hooks(self._on_shutdown, all_hooks, ignore_internal_hooks)
 
     @property
-    def on_cleanup(self) -> List[CommandHook]:
+    def on_cleanup(self) -> List[ApplicationHook]:
         return self._on_cleanup
 
     async def cleanup(self, all_hooks: bool = True, ignore_internal_hooks: bool = False) -> None:
         await self._execute_command_hooks(self._on_cleanup, all_hooks, ignore_internal_hooks)
+        await self.close_dependencies_pools()
+        self.close_executors()
+
+    def _get_executor(self, policy: ExecutionPolicy, handler: bool = False) -> Optional[Executor]:
+        if policy == 'inline':
+            return None
+        if policy == 'process' and not handler:
+            policy = 'thread'  # middleware, hooks and dependencies need the application, which is not picklable
+        executor = self._executors.get(policy, None)
+        if executor is None:
+            # created once and reused by every invocation until cleanup
+            if policy == 'process':
+                executor = ProcessPoolExecutor(max_workers=self._max_workers)
+            else:
+                executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='aiocli')
+            self._executors[policy] = executor
+        return executor
+
+    def close_executors(self) -> None:
+        executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=False)
+
+    async def close_dependencies_pools(self) -> None:
+        pools, self._dependencies_pools = self._dependencies_pools, {}
+        for pool in pools.values():
+            await pool.close()
 
     def colorize(self, color: bool) -> None:
         self._color = color
@@ -572,6 +1151,12 @@ class Application:
         if cmd.deprecated is None:
             cmd.deprecated = self._deprecated
         self._commands[cmd.name] = cmd
+        self._routes.insert(cmd.name)
+        self._parsers.pop(cmd.name, None)  # lazy, see get_parser
+        self._plans.pop(cmd.name, None)  # lazy, see _get_command_plan
+        self._update_main_parser_description(self._parser, cmd)
+
+    def _build_parser(self, cmd: Command) -> ArgumentParser:
         parser = ArgumentParser(
             add_help=self._parser.add_help,
             description=cmd.description,
@@ -589,28 +1174,20 @@ class Application:
                 arg = arg.dict(optional=False)  # type: ignore
             parser.add_argument(arg[0], **arg[1])  # type: ignore
         self._update_parser_help(parser, cmd.name)
-        self._parsers[cmd.name] = parser
-        self._update_main_parser_description(self._parser, cmd)
+        return parser
 
     async def _execute_command_middleware(
         self,
-        command_middleware: List[CommandMiddleware],
+        command_middleware: Tuple[_MiddlewarePlan, ...],
         cmd: Command,
         kwargs: Dict[str, Any],
+        executor: Optional[Executor] = None,
     ) -> None:
         if cmd.should_ignore_middleware():
-            self._log(msg='Command middleware ignored')
+            self._log('Command middleware ignored')
             return
-        for handler in command_middleware:
-            self._log(
-                msg='Executing middleware {0} with {1}({2})...'.format(
-                    type(handler),
-                    type(cmd),
-                    ', '.join(['{0}={1}'.format(key, val) for key, val in kwargs.items()]),
-                )
-            )
-            parameters_count = len(signature(handler).parameters)
-
+        for handler, parameters_count in command_middleware:
+            self._log('Executing middleware {0} with {1}({2})...', type(handler.func), type(cmd), _LogKwargs(kwargs))
             function_args: List[Any] = []
             if parameters_count == 0:
                 function_args = []
@@ -623,122 +1200,281 @@ class Application:
             else:
                 raise IndexError('Invalid number of parameters to resolve CommandMiddleware')
 
-            _ = await resolve_function(handler, *function_args)
+            _ = await handler.call_in_executor(executor, *function_args)
 
     async def _execute_command_hooks(
         self,
-        command_hooks: List[CommandHook],
+        command_hooks: List[ApplicationHook],
         all_hooks: bool = True,
         ignore_internal_hooks: bool = False,
     ) -> None:
-        command_hooks_ = (
-            command_hooks
-            if all_hooks
-            else [hook for hook in command_hooks if isinstance(hook, InternalCommandHook) and not ignore_internal_hooks]
-        )
-        for hook in command_hooks_:
-            if isinstance(hook, InternalCommandHook):
-                hook = hook.__call__
-            self._log(
-                msg='Executing hook "{0}" ({1})'.format(
-                    hook.__name__ if hasattr(hook, '__name__') else 'unknown', id(hook)
-                )
-            )
+        hooks = [hook_ if isinstance(hook_, Hook) else Hook(handler=hook_, after=('*',)) for hook_ in command_hooks]
+        if not all_hooks:
+            hooks = [
+                Hook(handler=hook_.handler, name=hook_.name, after=('*',))
+                for hook_ in hooks
+                if isinstance(hook_.handler, InternalCommandHook) and not ignore_internal_hooks
+            ]
+        executor = self._get_executor(self._execution_policy)
+        stages = self._schedule_command_hooks(hooks)
+        if len(stages) == len(hooks):
+            for stage in stages:
+                await self._execute_command_hook(hooks[stage[0][0]], executor)
+            return
+        tasks: Dict[int, 'Future[None]'] = {}
 
-            parameters_count = len(signature(hook).parameters)
+        async def execute(hook_: Hook, after: List['Future[None]']) -> None:
+            if after:
+                await gather(*after)
+            await self._execute_command_hook(hook_, executor)
 
-            if parameters_count == 0:
-                function_args = [hook]
-            elif parameters_count == 1:
-                function_args = [hook, self]  # type: ignore
-            else:
-                raise IndexError('Invalid number of parameters to resolve CommandHook')
+        for stage in stages:
+            for position, after in stage:
+                tasks[position] = ensure_future(execute(hooks[position], [tasks[before] for before in after]))
+        try:
+            await gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await gather(*tasks.values(), return_exceptions=True)
+            raise
+
+    @staticmethod
+    def _schedule_command_hooks(hooks: List[Hook]) -> List[List[Tuple[int, List[int]]]]:
+        # groups hooks in stages (topological order), each with the positions of the hooks it has to wait for
+        names: Dict[str, List[int]] = {}
+        for position, hook_ in enumerate(hooks):
+            names.setdefault(hook_.name or str(getattr(hook_.handler, '__name__', '')), []).append(position)
+        dependencies: List[List[int]] = []
+        barrier: Optional[int] = None  # last hook waiting for all before it, the ones after wait for it
+        for position, hook_ in enumerate(hooks):
+            after: List[int] = [] if barrier is None else [barrier]
+            for name in hook_.after:
+                if name == '*':  # plain hooks keep the registration order
+                    after.extend(range(position))
+                elif name in names:
+                    after.extend(names[name])
+                else:
+                    raise ValueError('Unknown hook "{0}" to run after'.format(name))
+            if '*' in hook_.after:
+                barrier = position
+            dependencies.append(sorted(set(after)))
+        stages: List[List[Tuple[int, List[int]]]] = []
+        done: Set[int] = set()
+        while len(done) < len(hooks):
+            stage = [
+                (position, after)
+                for position, after in enumerate(dependencies)
+                if position not in done and all(before in done for before in after)
+            ]
+            if not stage:
+                raise ValueError('Circular dependency between hooks')
+            done.update([position for position, _ in stage])
+            stages.append(stage)
+        return stages
+
+    async def _execute_command_hook(self, hook_: Hook, executor: Optional[Executor]) -> None:
+        function = self._compile_function(hook_.handler)
+        name = hook_.name or getattr(function.func, '__name__', 'unknown')
+        self._log('Executing hook "{0}" ({1})', name, id(function.func))
+
+        parameters_count = len(function.parameters)
+
+        if parameters_count == 0:
+            function_args = []
+        elif parameters_count == 1:
+            function_args = [self]
+        else:
+            raise IndexError('Invalid number of parameters to resolve CommandHook')
 
-            _ = await resolve_function(*function_args)
+        start = perf_counter()
+        _ = await function.call_in_executor(executor, *function_args)
+        if self._debug:
+            self._log('Hook "{0}" ({1}) finished in {2:.3f}s', name, id(function.func), perf_counter() - start)
 
     async def _resolve_command_handler_args(self, name: str, args: List[str]) -> Dict[str, Any]:
         if args:
-            self._log(msg='Resolving args: {0}'.format(', '.join(args)))
-        return vars(self._parsers[name].parse_args(args))
+            self._log('Resolving args: {0}', _LogJoin(args))
+        return vars(cast(ArgumentParser, self.get_parser(name)).parse_args(args))
 
-    async def _resolve_command_handler_kwargs(self, func: CommandHandler, kwargs: Dict[str, Any]) -> Dict[str, Any]:
-        func_params = [param for param in signature(func).parameters.values() if param.name not in kwargs]
+    async def _resolve_command_handler_kwargs(
+        self,
+        plan: _CommandPlan,
+        kwargs: Dict[str, Any],
+        invocation: _CommandInvocation,
+    ) -> Dict[str, Any]:
+        func_params = [param for param in plan.parameters if param.name not in kwargs]
         if func_params:
-            self._log(msg='Resolving kwargs: {0}'.format(', '.join([func_param.name for func_param in func_params])))
-        kwargs_ = {**kwargs}
-        for param in func_params:
-            kwargs_.update(
-                {
-                    param.name: await self._resolve_or_retrieve_from_cache_dependency(
-                        param.name, param.annotation, param.default
-                    )
-                }
-            )
-        return kwargs_
-
-    async def _resolve_command_handler_depends_args(self, depends: _Depends, is_handler: bool = True) -> Any:
-        kwargs = {}
-        for param in signature(depends.dependency).parameters.values():
-            self._log(
-                msg='Resolving "{0}" ({1}) {2} argument for "{3}" ({4})'.format(
-                    param.name,
-                    id(param.name),
-                    'handler' if is_handler else 'function',
-                    depends.dependency.__name__,
-                    id(depends.dependency),
-                )
-            )
-            kwargs.update(
-                {
-                    param.name: await self._resolve_or_retrieve_from_cache_dependency(
-                        param.name, param.annotation, param.default
-                    )
-                }
+            self._log('Resolving kwargs: {0}', _LogJoin([func_param.name for func_param in func_params]))
+        try:
+            return {**kwargs, **await self._resolve_parameters(func_params, invocation)}
+        except BaseException:
+            # shared dependencies still being created must not register on the exit stack once it has been closed
+            pending = [future for future in invocation.resolving.values() if not future.done()]
+            for future in pending:
+                future.cancel()
+            await gather(*pending, return_exceptions=True)
+            raise
+
+    async def _resolve_parameters(
+        self,
+        params: Sequence[_ParameterPlan],
+        invocation: _CommandInvocation,
+    ) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {}
+        dependencies: List[_ParameterPlan] = []
+        for param in params:
+            if param.dependency:
+                dependencies.append(param)
+            else:
+                kwargs[param.name] = self.state if param.state else param.default
+        if len(dependencies) == 1:
+            kwargs[dependencies[0].name] = await self._resolve_or_retrieve_from_cache_dependency(
+                dependencies[0].name, dependencies[0], invocation
             )
-            self._log(
-                msg='Solved "{0}" ({1}) {2} argument for "{3}" ({4})'.format(
-                    param.name,
-                    id(param.name),
-                    'handler' if is_handler else 'function',
-                    depends.dependency.__name__,
-                    id(depends.dependency),
-                )
+        elif dependencies:
+            # independent branches of the dependency graph are resolved concurrently
+            tasks = [
+                ensure_future(self._resolve_or_retrieve_from_cache_dependency(param.name, param, invocation))
+                for param in dependencies
+            ]
+            try:
+                values = await gather(*tasks)
+            except BaseException:
+                # the remaining branches must not register on the exit stack once the invocation has been closed,
+                # shared dependencies are cancelled by the outermost resolution
+                for task in tasks:
+                    task.cancel()
+                await gather(*tasks, return_exceptions=True)
+                raise
+            kwargs.update({param.name: value for param, value in zip(dependencies, values)})
+        return kwargs
+
+    async def _resolve_command_handler_depends_args(
+        self,
+        depends: _DependencyPlan,
+        invocation: _CommandInvocation,
+        is_handler: bool = True,
+    ) -> Any:
+        self._log_dependency_parameters('Resolving', depends, is_handler)
+        kwargs = await self._resolve_parameters(depends.parameters, invocation)
+        self._log_dependency_parameters('Solved', depends, is_handler)
+        if depends.depends.pool_size is not None:
+            return await self._acquire_pooled_dependency(depends, kwargs, invocation)
+        if depends.function.is_generator or depends.function.is_async_generator:
+            # teardown runs once the handler and the after middleware are done
+            return await invocation.exit_stack.enter_async_context(
+                _dependency_context(depends.function, kwargs, invocation.executor)
             )
-        return await resolve_function(depends.dependency, **kwargs)
+        return await depends.function.call_in_executor(invocation.executor, **kwargs)
 
-    async def _resolve_or_retrieve_from_cache_dependency(self, of: str, annotation: Any, value: Any) -> Any:
-        if isinstance(value, _Depends):
+    async def _acquire_pooled_dependency(
+        self,
+        depends: _DependencyPlan,
+        kwargs: Dict[str, Any],
+        invocation: _CommandInvocation,
+    ) -> Any:
+        pool = self._dependencies_pools.get(depends.depends.dependency, None)
+        if pool is None:
+            pool = _DependenciesPool(size=cast(int, depends.depends.pool_size))
+            self._dependencies_pools[depends.depends.dependency] = pool
+        resource = await pool.acquire(lambda: _dependency_context(depends.function, kwargs, invocation.executor))
+
+        async def release(
+            exc_type: Optional[Type[BaseException]],
+            exc: Optional[BaseException],
+            traceback: Optional[TracebackType],
+        ) -> None:
+            await pool.release(resource, discard=exc is not None)
+
+        invocation.exit_stack.push_async_exit(release)
+        return resource[0]
+
+    async def _resolve_or_retrieve_from_cache_dependency(
+        self,
+        of: str,
+        param: _ParameterPlan,
+        invocation: _CommandInvocation,
+    ) -> Any:
+        value = param.default
+        if param.dependency:
+            depends = param.dependency.depends
             self._log(
-                msg='Resolving "{0}" ({1}) dependency for "{2}" ({3})'.format(
-                    value.dependency.__name__, id(value.dependency), of, id(of)
-                )
+                'Resolving "{0}" ({1}) dependency for "{2}" ({3})',
+                depends.dependency.__name__,
+                id(depends.dependency),
+                of,
+                id(of),
             )
-            if value.cache and value.dependency in self._dependencies_cached:
-                new_value = self._dependencies_cached[value.dependency]
-            else:
-                new_value = await self._resolve_command_handler_depends_args(value, False)
-            if value.cache:
-                self._dependencies_cached.update({value.dependency: new_value})
-            value = new_value
-        elif isinstance(annotation, State) or issubclass(annotation, State):
+            if not depends.cache:
+                return await self._resolve_command_handler_depends_args(param.dependency, invocation, False)
+            application_scope = depends.scope == 'application' and not self._is_context_dependency(param.dependency)
+            if application_scope:
+                value = self._dependencies_cached.get(depends.dependency)
+                if value is not _missing:
+                    return value
+            # a cached dependency shared by several branches is only created once per invocation, or once for all
+            # the concurrent invocations in application scope
+            resolving = self._dependencies_resolving if application_scope else invocation.resolving
+            future = resolving.get(depends.dependency, None)
+            if future is None:
+                future = ensure_future(self._resolve_command_handler_depends_args(param.dependency, invocation, False))
+                resolving[depends.dependency] = future
+                if application_scope:
+                    future.add_done_callback(partial(self._forget_resolving_dependency, depends.dependency))
+            # shielded, a branch cancelled after a sibling failed must not cancel it for the other branches
+            value = await shield(future)
+            if application_scope:
+                self._dependencies_cached.set(depends.dependency, value, ttl=depends.ttl)
+        elif param.state:
             value = self.state
         return value
 
-    async def _execute_command_handler(self, handler: CommandHandler, kwargs: Dict[str, Any]) -> Any:
-        self._log(
-            msg='Executing command handler with: {0}.'.format(
-                ', '.join(['{0}={1}'.format(key, val) for key, val in kwargs.items()])
-            )
-            if kwargs
-            else 'Executing command handler.',
+    def _forget_resolving_dependency(self, dependency: Any, future: 'Future[Any]') -> None:
+        if self._dependencies_resolving.get(dependency, None) is future:
+            del self._dependencies_resolving[dependency]
+
+    @staticmethod
+    def _is_context_dependency(depends: _DependencyPlan) -> bool:
+        # values torn down or returned to a pool after the invocation can not outlive it
+        return (
+            depends.depends.pool_size is not None
+            or depends.function.is_generator
+            or depends.function.is_async_generator
         )
-        return await resolve_function(handler, **kwargs)
+
+    async def _execute_command_handler(
+        self,
+        handler: CompiledFunction,
+        kwargs: Dict[str, Any],
+        executor: Optional[Executor] = None,
+    ) -> Any:
+        if kwargs:
+            self._log('Executing command handler with: {0}.', _LogKwargs(kwargs))
+        else:
+            self._log('Executing command handler.')
+        return await handler.call_in_executor(executor, **kwargs)
+
+    async def _stream_command_handler(
+        self,
+        handler: CompiledFunction,
+        kwargs: Dict[str, Any],
+        output_format: OutputFormat,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self._log('Streaming command handler records as {0}.', output_format)
+        records = handler.func(**kwargs)
+        if handler.is_generator and executor is not None:
+            records = _iterate_in_executor(executor, records)  # each record is pulled in the executor
+        count = await stream_records(records, get_formatter(output_format))
+        self._log('Streamed {0} records.', count)
 
     async def _execute_command_exception_handler(
         self,
         err: BaseException,
         cmd: Command,
         kwargs: Dict[str, Any],
+        executor: Optional[Executor] = None,
     ) -> Optional[int]:
         typ = type(err)
         if typ not in self._exception_handlers:
@@ -749,29 +1485,50 @@ class Application:
             else:
                 raise err
         exception_handler = self._exception_handlers[typ]
-        self._log(
-            msg='Executing exception handler {0} with ({1})...'.format(
-                type(exception_handler),
-                ', '.join(['{0}={1}'.format(key, val) for key, val in kwargs.items()]),
-            )
+        self._log('Executing exception handler {0} with ({1})...', type(exception_handler), _LogKwargs(kwargs))
+        return cast(
+            Optional[int], await self._compile_function(exception_handler).call_in_executor(executor, err, cmd, kwargs)
         )
-        return cast(Optional[int], await resolve_function(exception_handler, err, cmd, kwargs))
 
-    def _log(self, msg: str) -> None:
-        if self._debug:
-            if self._use_print_for_logging:
-                print(msg)
-            else:
-                logger.debug(msg)
+    def _log(self, msg: str, *args: Any) -> None:
+        # the message is only formatted once we know it will be emitted
+        if not self._debug:
+            return
+        if self._use_print_for_logging:
+            print(msg.format(*args) if args else msg)
+        elif logger.isEnabledFor(DEBUG):
+            logger.debug(msg.format(*args) if args else msg)
+
+    def _log_dependency_parameters(self, action: str, depends: _DependencyPlan, is_handler: bool) -> None:
+        if not self._debug:
+            return
+        for param in depends.parameters:
+            self._log(
+                '{0} "{1}" ({2}) {3} argument for "{4}" ({5})',
+                action,
+                param.name,
+                id(param.name),
+                'handler' if is_handler else 'function',
+                depends.function.func.__name__,
+                id(depends.function.func),
+            )
 
     def _update_main_parser_description(self, parser: ArgumentParser, cmd: Command) -> None:
+        self._describe_command(parser, cmd)
+        self._description.stale = True  # lazy, see _render_main_parser_description
+
+    def _describe_command(self, parser: ArgumentParser, cmd: Command) -> None:
         router: Optional[str] = parser.prog
         if router and router != 'aiocli.commander':
             self._description.routers.setdefault(router, [])
             self._description.routers[router].append(cmd)
         else:
             self._description.default_router.append(cmd)
-        self._parser.description = self._description.parse()
+
+    def _render_main_parser_description(self) -> None:
+        if self._description.stale:
+            self._parser.description = self._description.parse()
+            self._description.stale = False
 
     def _update_parser_help(self, parser: ArgumentParser, prog: str) -> None:
         parser.usage = prog
@@ -788,7 +1545,7 @@ class Application:
         cast(ApplicationHelpFormatter, self._parser.formatter_class).color = self._color
         self._description.color = self._color
         self._update_parser_help(self._parser, cast(str, self._parser.usage))
-        self._parser.description = self._description.parse()
+        self._description.stale = True
         for _, parser in self._parsers.items():
             parser.formatter_class = self._parser.formatter_class
             self._update_parser_help(parser, cast(str, parser.usage))
@@ -797,7 +1554,15 @@ class Application:
         self._raw_input = args, kwargs
 
     def get_raw_input(self) -> ApplicationRawInput:
-        return self._raw_input
+        invocation = _get_current_invocation(self)
+        return invocation.raw_input if invocation else self._raw_input
+
+    def get_remaining_time(self) -> Optional[float]:
+        # seconds left before the current command is cancelled, None when it has no deadline
+        invocation = _get_current_invocation(self)
+        if invocation is None or invocation.deadline is None:
+            return None
+        return max(0.0, invocation.deadline - monotonic())
 
     def set_override_return(self, value: bool) -> None:
         self._override_return = value
@@ -0,0 +1,195 @@
+import sys
+from argparse import ArgumentParser
+from asyncio import (
+    AbstractEventLoop,
+    Semaphore,
+    Task,
+    all_tasks,
+    ensure_future,
+    gather,
+    get_running_loop,
+)
+from json import dumps, loads
+from shlex import split
+from traceback import print_exc
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Union,
+    cast,
+)
+
+from aiocli.commander import AppRunner, GracefulExit, _cancel_tasks
+from aiocli.commander_app import Application
+from aiocli.helpers import LoopFactory, get_or_create_event_loop, import_reference
+
+__all__ = (
+    # commander_batch
+    'BatchCommandResult',
+    'BatchResult',
+    'read_batch',
+    'run_batch',
+    'run_batch_app',
+    'main',
+)
+
+
+class BatchCommandResult(NamedTuple):
+    position: int
+    argv: List[str]
+    exit_code: int
+    error: Optional[str] = None  # e.g. invalid batch line
+
+
+class BatchResult(NamedTuple):
+    results: List[BatchCommandResult]
+
+    @property
+    def failed(self) -> int:
+        return len([result for result in self.results if result.exit_code != 0])
+
+    @property
+    def exit_code(self) -> int:
+        return 1 if self.failed else 0
+
+
+BatchCommand = Union[List[str], ValueError]
+
+
+def read_batch(lines: Iterable[str]) -> Iterator[BatchCommand]:
+    # one command per line, either a JSON array (JSON Lines) or shell-like words, blank and # lines are skipped,
+    # invalid lines are yielded as errors so the rest of the batch still runs
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            argv = loads(line) if line.startswith('[') else split(line)
+        except ValueError as err:  # e.g. invalid JSON or unbalanced quotes
+            yield ValueError('Invalid batch command "{0}": {1}'.format(line, err))
+            continue
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            yield ValueError('Invalid batch command "{0}", expected a list of strings'.format(line))
+            continue
+        yield argv
+
+
+async def run_batch(
+    app: Application,
+    batch: Iterable[BatchCommand],
+    *,
+    concurrency: int = 1,
+    report: Optional[TextIO] = None,
+) -> BatchResult:
+    if concurrency < 1:
+        raise ValueError('Batch concurrency must be greater than 0')
+    semaphore = Semaphore(concurrency)
+    results: List[BatchCommandResult] = []
+
+    def add_result(result: BatchCommandResult) -> None:
+        results.append(result)
+        if report:
+            report.write(dumps(result._asdict()) + '\n')
+
+    async def execute(position: int, argv: List[str]) -> None:
+        try:
+            response = await app(argv)
+            exit_code = response if isinstance(response, int) else app.exit_code
+        except Exception:  # pylint: disable=W0703
+            print_exc()
+            exit_code = 1
+        finally:
+            semaphore.release()
+        add_result(BatchCommandResult(position=position, argv=argv, exit_code=exit_code))
+
+    tasks: List['Task[None]'] = []
+    loop = get_running_loop()
+    commands = iter(batch)
+    position = 0
+    try:
+        while True:
+            if isinstance(batch, (list, tuple)):
+                argv = next(commands, None)
+            else:
+                # e.g. read_batch(sys.stdin), waiting for the next line must not stall the commands in flight
+                argv = await loop.run_in_executor(None, next, commands, None)
+            if argv is None:
+                break
+            if isinstance(argv, ValueError):
+                print(argv, file=sys.stderr)
+                add_result(BatchCommandResult(position=position, argv=[], exit_code=1, error=str(argv)))
+            else:
+                await semaphore.acquire()  # bounds the number of commands in flight
+                tasks.append(ensure_future(execute(position, argv)))
+            position += 1
+    finally:
+        # commands in flight finish even if reading the batch fails, before shutdown hooks run
+        await gather(*tasks, return_exceptions=True)
+    batch_result = BatchResult(results=sorted(results))
+    if report:
+        report.write(dumps({'total': len(batch_result.results), 'failed': batch_result.failed}) + '\n')
+    return batch_result
+
+
+def run_batch_app(
+    app: Union[Application, Callable[[], Application]],
+    *,
+    batch: Optional[Iterable[BatchCommand]] = None,  # stdin by default
+    concurrency: int = 1,
+    report: Optional[TextIO] = None,  # stderr by default
+    loop: Optional[AbstractEventLoop] = None,
+    loop_factory: Optional[LoopFactory] = None,
+    handle_signals: bool = True,
+    close_loop: bool = True,
+) -> int:
+    loop_ = loop or get_or_create_event_loop(loop_factory)
+    app_ = app if isinstance(app, Application) else app()
+    runner = AppRunner(app_, loop=loop_, handle_signals=handle_signals)
+    result = BatchResult(results=[])
+    try:
+        loop_.run_until_complete(runner.setup())  # startup hooks run once for the whole batch
+        try:
+            result = loop_.run_until_complete(
+                run_batch(
+                    app_,
+                    read_batch(sys.stdin) if batch is None else batch,
+                    concurrency=concurrency,
+                    report=sys.stderr if report is None else report,
+                )
+            )
+        finally:
+            loop_.run_until_complete(runner.cleanup(all_hooks=True))
+    except (GracefulExit, KeyboardInterrupt):  # pragma: no cover
+        pass
+    finally:
+        if not loop_.is_closed():
+            _cancel_tasks(to_cancel=all_tasks(loop=loop_), loop=loop_)
+            loop_.run_until_complete(loop_.shutdown_asyncgens())
+        if close_loop and not loop_.is_closed():
+            loop_.close()
+    return result.exit_code
+
+
+def _import_app(reference: str) -> Union[Application, Callable[[], Application]]:
+    return cast(Union[Application, Callable[[], Application]], import_reference(reference, default_attribute='app'))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = ArgumentParser(prog='python -m aiocli.commander_batch', description='Run many commands in one process')
+    parser.add_argument('app', help='Application or factory reference, e.g. "package.module:app"')
+    parser.add_argument('file', nargs='?', default='-', help='Commands file, one per line ("-" for stdin)')
+    parser.add_argument('--concurrency', type=int, default=1, help='Maximum number of commands in flight')
+    args = parser.parse_args(argv)
+    if args.file == '-':
+        return run_batch_app(_import_app(args.app), batch=read_batch(sys.stdin), concurrency=args.concurrency)
+    with open(args.file, encoding='utf-8') as file:
+        return run_batch_app(_import_app(args.app), batch=read_batch(file), concurrency=args.concurrency)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import os
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+from io import StringIO
+from json import dumps, loads
+from tempfile import NamedTemporaryFile
+from time import time
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
+
+__all__ = (
+    # commander_cache
+    'CommandCache',
+    'CachedResult',
+)
+
+
+_KEY_VERSION = 2
+
+
+def _default_directory() -> str:
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'aiocli')
+
+
+class CachedResult(NamedTuple):
+    response: Any
+    stdout: str
+    stderr: str
+
+
+class CommandCache(NamedTuple):
+    directory: Optional[str] = None  # None means $XDG_CACHE_HOME/aiocli
+    ttl: Optional[float] = None  # seconds, None means until evicted
+    max_size: Optional[int] = None  # bytes of the whole directory, least recently used results are evicted first
+    files: Sequence[str] = ()  # names of the arguments holding paths whose contents are part of the key
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory or _default_directory(), '{0}.json'.format(key))
+
+    def key(self, name: str, kwargs: Dict[str, Any], *, app: str = '', handler: str = '') -> str:
+        # the default directory is shared by every application, so the key includes which one and its handler
+        digest = sha256(dumps([_KEY_VERSION, app, handler, name, sorted(kwargs.items())], default=repr).encode())
+        for arg in self.files:
+            path = kwargs.get(arg, None)
+            if not path:
+                continue
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[CachedResult]:
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as file:
+                data = loads(file.read())
+            if self.ttl is not None and data['created'] + self.ttl <= time():
+                os.unlink(path)
+                return None
+            os.utime(path)  # most recently used
+            return CachedResult(response=data['response'], stdout=data['stdout'], stderr=data['stderr'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def store(self, key: str, result: CachedResult) -> bool:
+        try:
+            data = dumps(dict(result._asdict(), created=time()))
+        except (TypeError, ValueError):
+            return False  # responses that are not JSON serializable are not cached
+        directory = self.directory or _default_directory()
+        os.makedirs(directory, exist_ok=True)
+        with NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as file:
+            file.write(data)
+        os.replace(file.name, self._path(key))  # readers never see a partial result
+        if self.max_size is not None:
+            self._evict(directory, self.max_size)
+        return True
+
+    @staticmethod
+    def _evict(directory: str, max_size: int) -> None:
+        entries: List[os.DirEntry[str]] = [entry for entry in os.scandir(directory) if entry.name.endswith('.json')]
+        stats = sorted([(entry.stat(), entry.path) for entry in entries], key=lambda item: item[0].st_mtime)
+        size = sum([stat.st_size for stat, _ in stats])
+        for stat, path in stats:
+            if size <= max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:  # pragma: no cover
+                pass
+            size -= stat.st_size
+
+
+_Capture = Tuple[Tuple[TextIO, ...], bool]  # copies of the nested captures, and whether the stream is written too
+_stdout_capture: ContextVar[Optional[_Capture]] = ContextVar('aiocli_stdout_capture', default=None)
+_stderr_capture: ContextVar[Optional[_Capture]] = ContextVar('aiocli_stderr_capture', default=None)
+_captures = 0  # invocations capturing their output, the streams are replaced while there is any
+
+
+class _CapturedStream:
+    # replaces sys.stdout or sys.stderr once for all the invocations, writes are copied to the captures of the current
+    # one (if any), so concurrent invocations do not mix their output nor restore the streams out of order
+    def __init__(self, stream: TextIO, capture: 'ContextVar[Optional[_Capture]]') -> None:
+        self._stream = stream
+        self._capture = capture
+
+    def write(self, data: str) -> int:
+        copies, tee = self._capture.get() or ((), True)
+        for copy in copies:
+            copy.write(data)
+        return self._stream.write(data) if tee else len(data)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'buffer' and self._capture.get() is not None:
+            raise AttributeError(name)  # binary writes (e.g. OutputSink) go through write to be copied
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def _capture_output(*, tee: bool = True) -> Iterator[Tuple[StringIO, StringIO]]:
+    # output of the current invocation, also written to the streams unless tee is false (e.g. sent to a daemon client),
+    # nested captures (e.g. a cached command run by the daemon) get it as well
+    global _captures
+    if not _captures:
+        sys.stdout = _CapturedStream(sys.stdout, _stdout_capture)
+        sys.stderr = _CapturedStream(sys.stderr, _stderr_capture)
+    _captures += 1
+    stdout, stderr = StringIO(), StringIO()
+    tokens = []
+    for capture, copy in ((_stdout_capture, stdout), (_stderr_capture, stderr)):
+        copies, written = capture.get() or ((), True)
+        tokens.append(capture.set((copies + (copy,), written and tee)))
+    try:
+        yield stdout, stderr
+    finally:
+        _stdout_capture.reset(tokens[0])
+        _stderr_capture.reset(tokens[1])
+        _captures -= 1
+        if not _captures:
+            if isinstance(sys.stdout, _CapturedStream):
+                sys.stdout = sys.stdout._stream
+            if isinstance(sys.stderr, _CapturedStream):
+                sys.stderr = sys.stderr._stream
@@ -0,0 +1,103 @@
+import sys
+from shlex import quote
+from typing import List, Optional, Set
+
+from aiocli.commander_manifest_reader import Manifest, ManifestArgument, load_manifest
+
+__all__ = (
+    # commander_completion
+    'complete',
+    'completion_script',
+    'main',
+)
+
+# kept free of asyncio and aiocli.commander imports on purpose: it runs on every TAB press, answered from the manifest
+
+_bash_script = '''_{function}() {{
+    local IFS=$'\\n'
+    COMPREPLY=($({command} "${{COMP_WORDS[@]:1:COMP_CWORD}}"))
+}}
+complete -o default -F _{function} {prog}
+'''
+
+_zsh_script = '''#compdef {prog}
+_{function}() {{
+    local -a candidates
+    candidates=("${{(@f)$({command} "${{(@)words[2,CURRENT]}}")}}")
+    compadd -a candidates
+}}
+compdef _{function} {prog}
+'''
+
+_fish_script = '''complete -c {prog} -f -a '({command} (commandline -opc)[2..-1] (commandline -ct))'
+'''
+
+
+def _option(arguments: List[ManifestArgument], flag: str) -> Optional[ManifestArgument]:
+    for argument in arguments:
+        if flag in argument.flags:
+            return argument
+    return None
+
+
+def complete(manifest: Manifest, words: List[str]) -> List[str]:
+    # words typed after the program name, the last one is the word being completed ('' for a new word)
+    *typed, current = words or ['']
+    candidates: Set[str] = set()
+    for name in manifest.commands:
+        names = name.split(' ')
+        if len(names) > len(typed) and names[: len(typed)] == typed:
+            candidates.add(names[len(typed)])  # next word of nested commands ("calculator div")
+    depth = next((depth for depth in range(len(typed), 0, -1) if ' '.join(typed[:depth]) in manifest.commands), 0)
+    if not depth:
+        if not typed and current.startswith('-'):
+            candidates.update(['-h', '--help', '--version'])
+        return sorted([candidate for candidate in candidates if candidate.startswith(current)])
+    cmd = manifest.commands[' '.join(typed[:depth])]
+    rest = typed[depth:]
+    option = _option(cmd.optionals, rest[-1]) if rest else None
+    if option is not None and option.takes_value:
+        candidates = set([str(choice) for choice in option.choices or []])
+    elif current.startswith('-'):
+        candidates.update([flag for argument in cmd.optionals for flag in argument.flags])
+    else:
+        position = 0
+        for index, word in enumerate(rest):
+            option_ = _option(cmd.optionals, rest[index - 1]) if index else None
+            if not word.startswith('-') and not (option_ is not None and option_.takes_value):
+                position += 1
+        if position < len(cmd.positionals):
+            candidates.update([str(choice) for choice in cmd.positionals[position].choices or []])
+    return sorted([candidate for candidate in candidates if candidate.startswith(current)])
+
+
+def completion_script(shell: str, prog: str, manifest: str, *, python: str = sys.executable) -> str:
+    scripts = {'bash': _bash_script, 'zsh': _zsh_script, 'fish': _fish_script}
+    if shell not in scripts:
+        raise ValueError('Unsupported shell "{0}", expected one of {1}'.format(shell, ', '.join(scripts)))
+    command = '{0} -m aiocli.commander_completion complete {1} --'.format(quote(python), quote(manifest))
+    function = ''.join([char if char.isalnum() else '_' for char in prog]) + '_completion'
+    return scripts[shell].format(prog=prog, function=function, command=command)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) >= 2 and args[0] == 'complete':
+        manifest = load_manifest(args[1])
+        words = args[3:] if args[2:3] == ['--'] else args[2:]
+        if manifest is not None:  # nothing to offer from a missing or stale manifest, the shell falls back to files
+            sys.stdout.write(''.join(['{0}\n'.format(candidate) for candidate in complete(manifest, words)]))
+        return 0
+    if len(args) == 4 and args[0] == 'script':
+        sys.stdout.write(completion_script(args[1], args[2], args[3]))
+        return 0
+    print(
+        'Usage: python -m aiocli.commander_completion script {bash,zsh,fish} PROG MANIFEST\n'
+        '       python -m aiocli.commander_completion complete MANIFEST -- [WORDS...]',
+        file=sys.stderr,
+    )
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import os
+from asyncio import (
+    AbstractEventLoop,
+    AbstractServer,
+    StreamReader,
+    StreamWriter,
+    all_tasks,
+    start_unix_server,
+)
+from contextlib import suppress
+from json import dumps, loads
+from traceback import print_exc
+from typing import Any, Callable, Dict, Optional, Union
+
+from aiocli.commander import AppRunner, GracefulExit, _cancel_tasks
+from aiocli.commander_app import Application
+from aiocli.commander_cache import _capture_output
+from aiocli.commander_daemon_client import DaemonResponse, request_daemon
+from aiocli.helpers import LoopFactory, get_or_create_event_loop
+
+__all__ = (
+    # commander_daemon_client
+    'DaemonResponse',
+    'request_daemon',
+    # commander_daemon
+    'start_app_server',
+    'serve_app',
+    'run_daemon_app',
+)
+
+
+async def _execute(app: Application, request: Dict[str, Any]) -> DaemonResponse:
+    exit_code = 1
+    # the output of each request is captured apart (not written to the streams of the daemon), so they run concurrently
+    with _capture_output(tee=False) as (stdout, stderr):
+        try:
+            argv = request.get('argv')
+            if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+                raise ValueError('Invalid argv, expected a list of strings')
+            if request.get('cwd', os.getcwd()) != os.getcwd():
+                # the working directory is process wide, relative paths would resolve against the one of the daemon
+                raise ValueError('Invalid cwd "{0}", expected "{1}"'.format(request.get('cwd'), os.getcwd()))
+            response = await app(argv)
+            exit_code = response if isinstance(response, int) else app.exit_code
+        except Exception:  # pylint: disable=W0703
+            print_exc()
+    return DaemonResponse(exit_code=exit_code, stdout=stdout.getvalue(), stderr=stderr.getvalue())
+
+
+async def start_app_server(app: Application, *, path: str) -> AbstractServer:
+    async def handle(reader: StreamReader, writer: StreamWriter) -> None:
+        try:
+            try:
+                request = loads(await reader.readline() or b'{}')
+            except ValueError as err:  # e.g. invalid JSON or encoding
+                response = DaemonResponse(exit_code=1, stdout='', stderr='Invalid request: {0}\n'.format(err))
+            else:
+                response = await _execute(app, request if isinstance(request, dict) else {})
+            writer.write(dumps(response._asdict()).encode())
+            await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a previous daemon
+    return await start_unix_server(handle, path=path)
+
+
+async def serve_app(app: Application, *, path: str) -> None:
+    server = await start_app_server(app, path=path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        with suppress(FileNotFoundError):
+            os.unlink(path)
+
+
+def run_daemon_app(
+    app: Union[Application, Callable[[], Application]],
+    *,
+    path: str,
+    loop: Optional[AbstractEventLoop] = None,
+    loop_factory: Optional[LoopFactory] = None,
+    handle_signals: bool = True,
+    close_loop: bool = True,
+) -> None:
+    loop_ = loop or get_or_create_event_loop(loop_factory)
+    app_ = app if isinstance(app, Application) else app()
+    runner = AppRunner(app_, loop=loop_, handle_signals=handle_signals)
+    try:
+        loop_.run_until_complete(runner.setup())
+        loop_.run_until_complete(serve_app(app_, path=path))
+    except (GracefulExit, KeyboardInterrupt):  # pragma: no cover
+        pass
+    finally:
+        if not loop_.is_closed():
+            _cancel_tasks(to_cancel=all_tasks(loop=loop_), loop=loop_)
+            loop_.run_until_complete(runner.cleanup(all_hooks=True))
+            loop_.run_until_complete(loop_.shutdown_asyncgens())
+        if close_loop and not loop_.is_closed():
+            loop_.close()
@@ -0,0 +1,57 @@
+import json
+import os
+import socket
+import sys
+from typing import List, NamedTuple, Optional
+
+__all__ = (
+    # commander_daemon_client
+    'DaemonResponse',
+    'request_daemon',
+    'main',
+)
+
+# kept free of asyncio and aiocli.commander imports on purpose: this module is the thin client that runs per command
+
+DAEMON_SOCKET_ENV = 'AIOCLI_DAEMON_SOCKET'
+
+
+class DaemonResponse(NamedTuple):
+    exit_code: int
+    stdout: str
+    stderr: str
+
+
+def request_daemon(path: str, argv: List[str], *, timeout: Optional[float] = None) -> DaemonResponse:
+    # the daemon rejects requests from another working directory (relative paths would resolve against its own), and
+    # stdin is not forwarded, commands reading "-" get the stdin of the daemon
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps({'argv': argv, 'cwd': os.getcwd()}).encode() + b'\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    response = json.loads(b''.join(chunks))
+    return DaemonResponse(exit_code=response['exit_code'], stdout=response['stdout'], stderr=response['stderr'])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    path = os.environ.get(DAEMON_SOCKET_ENV)
+    if not path:
+        if not args:
+            print('Usage: python -m aiocli.commander_daemon_client SOCKET [ARGV...]', file=sys.stderr)
+            return 2
+        path, args = args[0], args[1:]
+    response = request_daemon(path, args)
+    sys.stdout.write(response.stdout)
+    sys.stderr.write(response.stderr)
+    return response.exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
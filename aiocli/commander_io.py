@@ -0,0 +1,182 @@
+import mmap
+import os
+import sys
+from abc import ABC, abstractmethod
+from argparse import ArgumentTypeError
+from asyncio import (
+    BaseTransport,
+    Future,
+    StreamReader,
+    StreamReaderProtocol,
+    get_running_loop,
+)
+from codecs import getincrementaldecoder
+from collections import deque
+from contextlib import suppress
+from io import BufferedIOBase, IncrementalNewlineDecoder
+from locale import getpreferredencoding
+from stat import S_ISREG
+from typing import Any, AsyncIterator, BinaryIO, Deque, List, Optional, cast
+
+from aiocli.commander_app import _current_invocation
+
+__all__ = (
+    # commander_io
+    'AsyncLines',
+    'AsyncChunks',
+    'memory_map',
+)
+
+
+class _AsyncFileStream(ABC):
+    # argument type reading a path or "-" (stdin) in the background, the file is closed when the invocation finishes:
+    # regular files are read in the default executor, one read of about buffer_size is prefetched while the previous
+    # one is consumed, pipes, terminals and sockets are read by the event loop as data arrives, so the handler gets
+    # it without waiting for a full buffer or the end of the input, and closing does not wait for input that may
+    # never come
+    def __init__(self, path: str, *, buffer_size: int) -> None:
+        self.name = path
+        self._buffer_size = buffer_size
+        self._owned = path != '-'
+        try:
+            self._file: BinaryIO = open(path, 'rb') if self._owned else sys.stdin.buffer
+        except OSError as err:
+            raise ArgumentTypeError("can't open '{0}': {1}".format(path, err)) from err
+        try:
+            self._regular = S_ISREG(os.fstat(self._file.fileno()).st_mode)
+        except (OSError, ValueError):  # e.g. replaced stdin without file descriptor
+            self._regular = True
+        self._batch: Deque[Any] = deque()
+        self._pending: Optional['Future[bytes]'] = None
+        self._reader: Optional[StreamReader] = None
+        self._transport: Optional[BaseTransport] = None
+        self._blocking: Optional[bool] = None
+        self._connected = False
+        self._done = False
+        invocation = _current_invocation.get()
+        if invocation is not None:
+            invocation.exit_stack.push_async_callback(self.aclose)
+
+    @abstractmethod
+    def _parse(self, data: bytes) -> List[Any]:
+        # items of the data read, b'' at the end of the file
+        pass
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self
+
+    async def __anext__(self) -> Any:
+        while not self._batch:
+            if self._done or self._file.closed:
+                raise StopAsyncIteration
+            data = await (self._read_file() if self._regular else self._read_pipe())
+            self._done = not data
+            self._batch.extend(self._parse(data))
+        return self._batch.popleft()
+
+    async def _read_file(self) -> bytes:
+        loop = get_running_loop()
+        data = await (self._pending or loop.run_in_executor(None, self._file.read, self._buffer_size))
+        self._pending = loop.run_in_executor(None, self._file.read, self._buffer_size) if data else None
+        return data
+
+    async def _read_pipe(self) -> bytes:
+        if not self._connected:
+            self._connected = True
+            self._reader = await self._connect_pipe()
+        if self._reader is None:  # e.g. not supported by the event loop
+            return await get_running_loop().run_in_executor(
+                None, cast(BufferedIOBase, self._file).read1, self._buffer_size
+            )
+        return await self._reader.read(self._buffer_size)
+
+    async def _connect_pipe(self) -> Optional[StreamReader]:
+        loop = get_running_loop()
+        reader = StreamReader(limit=self._buffer_size, loop=loop)
+        fd = self._file.fileno()
+        # the transport closes its pipe, a duplicate keeps stdin open, and makes the file descriptor non blocking,
+        # which is shared with the duplicate and restored once closed
+        pipe = os.fdopen(os.dup(fd), 'rb', buffering=0)
+        try:
+            self._blocking = os.get_blocking(fd)
+            self._transport, _ = await loop.connect_read_pipe(lambda: StreamReaderProtocol(reader, loop=loop), pipe)
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            pipe.close()
+            self._blocking = None
+            return None
+        return reader
+
+    async def aclose(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+            if self._blocking is not None:
+                with suppress(OSError, ValueError):
+                    os.set_blocking(self._file.fileno(), self._blocking)
+        if self._pending is not None:
+            with suppress(Exception):
+                await self._pending  # regular files only, the executor can not be interrupted, wait before closing
+            self._pending = None
+        self._done = True
+        if self._owned:
+            self._file.close()
+
+    def __repr__(self) -> str:
+        return '{0}({1!r})'.format(type(self).__name__, self.name)
+
+
+class AsyncLines(_AsyncFileStream):
+    # e.g. CommandArgument('input', type=AsyncLines), then "async for line in input", with universal newlines as
+    # files opened in text mode
+    def __init__(self, path: str, *, encoding: Optional[str] = 'utf-8', buffer_size: int = 64 * 1024) -> None:
+        super().__init__(path, buffer_size=buffer_size)
+        decoder = getincrementaldecoder(encoding or getpreferredencoding(False))()
+        self._decoder = IncrementalNewlineDecoder(decoder, translate=True)
+        self._line = ''
+
+    def _parse(self, data: bytes) -> List[str]:
+        lines = (self._line + self._decoder.decode(data, final=not data)).split('\n')
+        self._line = lines.pop()  # incomplete, until the next data
+        batch = [line + '\n' for line in lines]
+        if not data and self._line:  # last line without newline
+            batch.append(self._line)
+            self._line = ''
+        return batch
+
+
+class AsyncChunks(_AsyncFileStream):
+    # e.g. CommandArgument('input', type=partial(AsyncChunks, chunk_size=4096)), then "async for chunk in input",
+    # chunks of pipes are at most chunk_size, as much as has arrived
+    def __init__(self, path: str, *, chunk_size: int = 64 * 1024, buffer_size: int = 1024 * 1024) -> None:
+        super().__init__(path, buffer_size=max(buffer_size // chunk_size, 1) * chunk_size)
+        self._chunk_size = chunk_size
+
+    def _parse(self, data: bytes) -> List[bytes]:
+        if len(data) <= self._chunk_size:
+            return [data] if data else []
+        return [data[start : start + self._chunk_size] for start in range(0, len(data), self._chunk_size)]
+
+
+def _release_memory_map(view: memoryview, mapping: mmap.mmap) -> None:
+    try:
+        view.release()
+        mapping.close()
+    except BufferError:  # slices of the view still alive, the mapping is closed once they are collected
+        pass
+
+
+def memory_map(path: str) -> memoryview:
+    # argument type giving a zero copy, read only view of the file, unmapped once the invocation finishes (after the
+    # handler and after middleware), so slices must not be kept beyond it
+    try:
+        with open(path, 'rb') as file:
+            if not os.fstat(file.fileno()).st_size:
+                return memoryview(b'')  # empty files can not be mapped
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as err:
+        raise ArgumentTypeError("can't open '{0}': {1}".format(path, err)) from err
+    view = memoryview(mapping)
+    invocation = _current_invocation.get()
+    if invocation is not None:
+        invocation.exit_stack.callback(_release_memory_map, view, mapping)
+    return view
@@ -0,0 +1,134 @@
+import os
+import sys
+from argparse import SUPPRESS, ArgumentParser, _VersionAction
+from json import dump
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from aiocli.commander_app import Application, Command
+from aiocli.commander_batch import _import_app
+from aiocli.commander_manifest_reader import (
+    _MANIFEST_VERSION,
+    Manifest,
+    ManifestArgument,
+    ManifestCommand,
+    load_manifest,
+    run_manifest_app,
+)
+from aiocli.helpers import import_reference
+
+__all__ = (
+    # commander_manifest_reader
+    'ManifestArgument',
+    'ManifestCommand',
+    'Manifest',
+    'load_manifest',
+    'run_manifest_app',
+    # commander_manifest
+    'build_manifest',
+    'write_manifest',
+    'main',
+)
+
+_internal_commands = ('-h', '--help', '-v', '--version')
+
+
+def _handler_reference(handler: Any) -> Tuple[Optional[str], Optional[str]]:
+    if isinstance(handler, str):
+        return handler.partition(':')[0], handler
+    module, qualname = getattr(handler, '__module__', None), getattr(handler, '__qualname__', None)
+    if not module or not qualname or '<locals>' in qualname:
+        return module, None
+    reference = '{0}:{1}'.format(module, qualname)
+    try:
+        return module, reference if import_reference(reference) is handler else None
+    except (ImportError, AttributeError):
+        return module, None
+
+
+def _describe_arguments(parser: ArgumentParser) -> Tuple[List[ManifestArgument], List[ManifestArgument]]:
+    positionals: List[ManifestArgument] = []
+    optionals: List[ManifestArgument] = []
+    for action in parser._actions:  # pylint: disable=W0212
+        if action.help == SUPPRESS:
+            continue
+        choices = list(cast(Any, action.choices)) if isinstance(action.choices, (list, tuple, range)) else None
+        argument = ManifestArgument(
+            flags=list(action.option_strings),
+            dest=action.dest,
+            help=action.help,
+            choices=[choice for choice in choices if isinstance(choice, (str, int, float))] if choices else None,
+            takes_value=action.nargs != 0,
+        )
+        (optionals if action.option_strings else positionals).append(argument)
+    return positionals, optionals
+
+
+def _describe_command(app: Application, cmd: Command) -> ManifestCommand:
+    module, handler = _handler_reference(cmd.handler)
+    parser = cast(ArgumentParser, app.get_parser(cmd.name))
+    positionals, optionals = _describe_arguments(parser)
+    return ManifestCommand(
+        name=cmd.name,
+        description=cmd.description,
+        help=parser.format_help(),
+        module=module,
+        handler=handler,
+        positionals=positionals,
+        optionals=optionals,
+    )
+
+
+def _module_source(module_name: Optional[str]) -> Optional[str]:
+    module = sys.modules.get(module_name or '', None)
+    path = getattr(module, '__file__', None)
+    return os.path.abspath(path) if path else None
+
+
+def build_manifest(app: Application, *, reference: str) -> Manifest:
+    commands = {cmd.name: _describe_command(app, cmd) for cmd in app.commands if cmd.name not in _internal_commands}
+    modules = [reference.partition(':')[0], *[cmd.module for cmd in commands.values()]]
+    sources: Dict[str, Tuple[int, int]] = {}
+    for path in [_module_source(module) for module in modules]:
+        if path and path not in sources:
+            stat = os.stat(path)
+            sources[path] = (stat.st_mtime_ns, stat.st_size)
+    versions = [action for action in app.parser._actions if isinstance(action, _VersionAction)]  # pylint: disable=W0212
+    return Manifest(
+        app=reference,
+        help=app.parser.format_help(),
+        version=versions[0].version if versions else None,
+        default_command=app.default_command,
+        commands=commands,
+        sources=sources,
+    )
+
+
+def write_manifest(manifest: Manifest, path: str) -> None:
+    data = manifest._asdict()
+    data['_version'] = _MANIFEST_VERSION
+    data['commands'] = {
+        name: dict(
+            cmd._asdict(),
+            positionals=[argument._asdict() for argument in cmd.positionals],
+            optionals=[argument._asdict() for argument in cmd.optionals],
+        )
+        for name, cmd in manifest.commands.items()
+    }
+    tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(tmp, 'w', encoding='utf-8') as file:
+        dump(data, file)
+    os.replace(tmp, path)  # readers never see a partial manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = ArgumentParser(prog='python -m aiocli.commander_manifest', description='Build a command manifest')
+    parser.add_argument('app', help='Application or factory reference, e.g. "package.module:app"')
+    parser.add_argument('manifest', help='Manifest file to write')
+    args = parser.parse_args(argv)
+    app = _import_app(args.app)
+    write_manifest(build_manifest(app if isinstance(app, Application) else app(), reference=args.app), args.manifest)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import os
+import sys
+from json import load
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+__all__ = (
+    # commander_manifest_reader
+    'ManifestArgument',
+    'ManifestCommand',
+    'Manifest',
+    'load_manifest',
+    'run_manifest_app',
+)
+
+# kept free of asyncio and aiocli.commander imports on purpose: help and completion are answered from the manifest
+# alone, the application is imported in full to run a command since its hooks, middleware, state and argument types
+# are not part of the manifest
+
+_MANIFEST_VERSION = 2
+
+
+class ManifestArgument(NamedTuple):
+    flags: List[str]  # empty for positionals
+    dest: str
+    help: Optional[str]
+    choices: Optional[List[Union[str, int, float]]]
+    takes_value: bool
+
+
+class ManifestCommand(NamedTuple):
+    name: str
+    description: Optional[str]
+    help: str
+    module: Optional[str]  # owning module
+    handler: Optional[str]  # "package.module:handler" when importable by reference
+    positionals: List[ManifestArgument]
+    optionals: List[ManifestArgument]
+
+
+class Manifest(NamedTuple):
+    app: str  # "package.module:app" reference of the application or its factory
+    help: str
+    version: Optional[str]
+    default_command: str
+    commands: Dict[str, ManifestCommand]
+    sources: Dict[str, Tuple[int, int]]  # path -> (mtime_ns, size) of the modules the registry comes from
+
+    def is_stale(self) -> bool:
+        for path, (mtime_ns, size) in self.sources.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return True
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return True
+        return False
+
+    def resolve_command(self, argv: List[str]) -> Optional[ManifestCommand]:
+        # longest command name matching the leading words ("calculator div")
+        for depth in range(len(argv), 0, -1):
+            cmd = self.commands.get(' '.join(argv[:depth]), None)
+            if cmd is not None:
+                return cmd
+        return None if argv else self.commands.get(self.default_command, None)
+
+
+def load_manifest(path: str) -> Optional[Manifest]:
+    # None when the manifest is missing, unreadable, from another version or stale
+    try:
+        with open(path, encoding='utf-8') as file:
+            data: Dict[str, Any] = load(file)
+        if data.pop('_version', None) != _MANIFEST_VERSION:
+            return None
+        manifest = Manifest(
+            app=data['app'],
+            help=data['help'],
+            version=data['version'],
+            default_command=data['default_command'],
+            commands={
+                name: ManifestCommand(
+                    name=cmd['name'],
+                    description=cmd['description'],
+                    help=cmd['help'],
+                    module=cmd['module'],
+                    handler=cmd['handler'],
+                    positionals=[ManifestArgument(**argument) for argument in cmd['positionals']],
+                    optionals=[ManifestArgument(**argument) for argument in cmd['optionals']],
+                )
+                for name, cmd in data['commands'].items()
+            },
+            sources={path_: (stat[0], stat[1]) for path_, stat in data['sources'].items()},
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return None if manifest.is_stale() else manifest
+
+
+def _command_help(manifest: Manifest, args: List[str]) -> Optional[str]:
+    # "calculator div --help" as argparse would answer it, options after "--" are values
+    cmd = manifest.resolve_command(args)
+    if cmd is None:
+        return None
+    rest = args[len(cmd.name.split(' ')) :] if args else []
+    rest = rest[: rest.index('--')] if '--' in rest else rest
+    flags = [flag for argument in cmd.optionals if argument.dest == 'help' for flag in argument.flags]
+    return cmd.help if any(arg in flags for arg in rest) else None
+
+
+def run_manifest_app(
+    app: str,
+    *,
+    manifest: str,
+    argv: Optional[List[str]] = None,
+    exit_code: bool = True,
+    **kwargs: Any,
+) -> Any:
+    args = sys.argv[1:] if argv is None else argv
+    manifest_ = load_manifest(manifest)
+    if manifest_ is not None and manifest_.app == app:
+        name = args[0] if args else manifest_.default_command
+        output: Optional[str] = None
+        if name in ('-h', '--help'):
+            output = manifest_.help
+        elif name in ('-v', '--version') and manifest_.version is not None:
+            output = manifest_.version + '\n'
+        else:
+            output = _command_help(manifest_, args)
+        if output is not None:
+            sys.stdout.write(output)
+            if exit_code:
+                sys.exit(0)
+            return 0
+    # stale or missing manifest, or a command to run
+    from aiocli.commander import run_app  # pylint: disable=C0415
+    from aiocli.commander_batch import _import_app  # pylint: disable=C0415
+
+    return run_app(_import_app(app), argv=args, exit_code=exit_code, **kwargs)
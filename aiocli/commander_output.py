@@ -0,0 +1,126 @@
+import os
+import sys
+from asyncio import get_running_loop
+from codecs import getincrementaldecoder
+from typing import IO, BinaryIO, Iterator, List, Optional, TextIO, Union, cast
+
+__all__ = (
+    # commander_output
+    'OutputSink',
+    'output_sink',
+)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class OutputSink:
+    # batches small writes into large ones written to the binary buffer of the stream (sys.stdout by default), buffers
+    # are kept by reference (not copied) until flushed so they must not be modified before, writes of at least
+    # buffer_size are passed to the stream as they are, text streams without a binary buffer (e.g. redirected to a
+    # StringIO) are written decoded
+    def __init__(self, stream: Optional[Union[TextIO, BinaryIO]] = None, *, buffer_size: int = 64 * 1024) -> None:
+        stream_ = sys.stdout if stream is None else stream
+        self._text: Optional[TextIO] = cast(TextIO, stream_) if hasattr(stream_, 'encoding') else None
+        self._stream: Optional[BinaryIO] = (
+            getattr(stream_, 'buffer', None) if self._text is not None else cast(BinaryIO, stream_)
+        )
+        self.encoding: str = getattr(self._text, 'encoding', None) or 'utf-8'
+        self.buffer_size = buffer_size
+        self._decoder = getincrementaldecoder(self.encoding)(errors='replace')
+        self._buffers: List[Buffer] = []
+        self._buffered = 0
+
+    @property
+    def buffered(self) -> int:
+        return self._buffered
+
+    def write(self, data: Buffer) -> None:
+        if len(data) >= self.buffer_size:
+            self.flush()
+            self._write(data)
+            self._flush_stream()
+            return
+        self._buffers.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    async def awrite(self, data: Buffer) -> None:
+        # full buffers are written in the default executor, so a slow reader (e.g. a full pipe) holds back the
+        # caller (backpressure) without blocking the event loop
+        if self._buffered + len(data) >= self.buffer_size:
+            await get_running_loop().run_in_executor(None, self.write, data)
+        else:
+            self.write(data)
+
+    def flush(self) -> None:
+        if self._buffers:
+            buffers, self._buffers, self._buffered = self._buffers, [], 0
+            self._write(buffers[0] if len(buffers) == 1 else b''.join(buffers))
+        self._flush_stream()
+
+    def sendfile(self, file: Union[str, IO[bytes]], offset: int = 0, count: Optional[int] = None) -> int:
+        # emits the contents of a file (path or binary file), copied by the kernel with os.sendfile when the stream
+        # has a file descriptor, returns the number of bytes written
+        if isinstance(file, str):
+            with open(file, 'rb') as file_:
+                return self.sendfile(file_, offset, count)
+        self.flush()
+        size = os.fstat(file.fileno()).st_size - offset if count is None else count
+        sent = 0
+        fd = self._fileno()
+        while fd is not None and sent < size:
+            try:
+                written = os.sendfile(fd, file.fileno(), offset + sent, size - sent)
+            except OSError:
+                if sent:
+                    raise
+                break  # e.g. not supported between these files, copied below
+            if not written:
+                return sent
+            sent += written
+        if sent < size:
+            file.seek(offset + sent)
+            while sent < size:
+                chunk = file.read(min(self.buffer_size, size - sent))
+                if not chunk:
+                    break
+                self._write(chunk)
+                sent += len(chunk)
+            self._flush_stream()
+        return sent
+
+    async def asendfile(self, file: Union[str, IO[bytes]], offset: int = 0, count: Optional[int] = None) -> int:
+        # sendfile in the default executor, so emitting a large file does not block the event loop
+        return await get_running_loop().run_in_executor(None, self.sendfile, file, offset, count)
+
+    def _fileno(self) -> Optional[int]:
+        if self._stream is None or not hasattr(os, 'sendfile'):
+            return None
+        try:
+            return self._stream.fileno()
+        except (OSError, ValueError):  # e.g. io.BytesIO
+            return None
+
+    def _write(self, data: Buffer) -> None:
+        if self._stream is None:
+            cast(TextIO, self._text).write(self._decoder.decode(data))
+            return
+        if self._text is not None:
+            self._text.flush()  # keeps the order with what has been printed before
+        self._stream.write(data)
+
+    def _flush_stream(self) -> None:
+        if self._text is not None:
+            self._text.flush()
+        if self._stream is not None:
+            self._stream.flush()
+
+
+def output_sink() -> Iterator[OutputSink]:
+    # dependency, e.g. "sink: OutputSink = Depends(output_sink, cache=False)", flushed once the handler finishes
+    sink = OutputSink()
+    try:
+        yield sink
+    finally:
+        sink.flush()
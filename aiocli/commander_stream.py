@@ -0,0 +1,123 @@
+from abc import ABC, abstractmethod
+from asyncio import get_running_loop
+from csv import writer
+from io import StringIO
+from json import dumps
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Union,
+    cast,
+)
+
+from .commander_output import OutputSink
+
+__all__ = (
+    # commander_stream
+    'RecordFormatter',
+    'JsonLinesFormatter',
+    'CsvFormatter',
+    'TsvFormatter',
+    'OutputFormat',
+    'get_formatter',
+    'stream_records',
+)
+
+
+class RecordFormatter(ABC):
+    # bytes are written as they are, str is encoded with the encoding of the output
+    @abstractmethod
+    def format(self, record: Any) -> Union[str, bytes]:
+        pass
+
+
+class JsonLinesFormatter(RecordFormatter):
+    def format(self, record: Any) -> str:
+        return dumps(record, default=str) + '\n'
+
+
+class CsvFormatter(RecordFormatter):
+    # dict records write a header from the keys of the first one, other records are written as rows
+    def __init__(self, delimiter: str = ',', header: bool = True) -> None:
+        self._buffer = StringIO()
+        self._writer = writer(self._buffer, delimiter=delimiter, lineterminator='\n')
+        self._header = header
+        self._fields: Optional[List[Any]] = None
+
+    def format(self, record: Any) -> str:
+        if isinstance(record, dict):
+            if self._fields is None:
+                self._fields = list(record)
+                if self._header:
+                    self._writer.writerow(self._fields)
+            self._writer.writerow([record.get(field, '') for field in self._fields])
+        else:
+            self._writer.writerow(record if isinstance(record, (list, tuple)) else [record])
+        value = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return value
+
+
+class TsvFormatter(CsvFormatter):
+    def __init__(self, header: bool = True) -> None:
+        super().__init__(delimiter='\t', header=header)
+
+
+# formatters keep state (e.g. the CSV header), so a new one is created for every invocation
+OutputFormat = Union[str, Callable[[], RecordFormatter]]
+
+_formatters: Dict[str, Callable[[], RecordFormatter]] = {
+    'jsonl': JsonLinesFormatter,
+    'csv': CsvFormatter,
+    'tsv': TsvFormatter,
+}
+
+
+def get_formatter(output_format: OutputFormat) -> RecordFormatter:
+    if callable(output_format):
+        return output_format()
+    if output_format not in _formatters:
+        raise ValueError(
+            'Unknown output format "{0}", expected one of {1}'.format(output_format, ', '.join(_formatters))
+        )
+    return _formatters[output_format]()
+
+
+async def stream_records(
+    records: Union[Iterator[Any], AsyncIterator[Any]],
+    formatter: RecordFormatter,
+    output: Optional[Union[TextIO, BinaryIO, OutputSink]] = None,  # sys.stdout by default
+    *,
+    buffer_size: int = 64 * 1024,
+) -> int:
+    # records are batched by the sink into writes of about buffer_size, the next records are not pulled until the
+    # previous batch has been written (backpressure), writes happen in the default executor so a slow reader (e.g. a
+    # full pipe) does not block the event loop, memory stays bounded by buffer_size whatever the number of records
+    sink = output if isinstance(output, OutputSink) else OutputSink(output, buffer_size=buffer_size)
+    count = 0
+
+    async def append(record: Any) -> None:
+        nonlocal count
+        value = formatter.format(record)
+        await sink.awrite(value.encode(sink.encoding) if isinstance(value, str) else value)
+        count += 1
+
+    try:
+        if hasattr(records, '__aiter__'):
+            async for record in cast(AsyncIterator[Any], records):
+                await append(record)
+        else:
+            for record in records:
+                await append(record)
+    finally:
+        # records yielded before a failure are still written
+        await get_running_loop().run_in_executor(None, sink.flush)
+    return count
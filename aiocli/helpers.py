@@ -1,12 +1,35 @@
-from asyncio import get_event_loop_policy, iscoroutinefunction
-from typing import Any, Callable, Coroutine
+import asyncio
+from asyncio import (
+    AbstractEventLoop,
+    get_event_loop_policy,
+    get_running_loop,
+    iscoroutinefunction,
+    new_event_loop,
+    set_event_loop,
+)
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import suppress
+from contextvars import copy_context
+from functools import partial
+from importlib import import_module
+from inspect import Parameter, isasyncgenfunction, isgeneratorfunction, signature
+from typing import Any, Callable, Coroutine, NamedTuple, Optional, Tuple, cast
+from warnings import catch_warnings, simplefilter
 
 __all__ = (
     # helpers
     'resolve_function',
     'resolve_coroutine',
+    'CompiledFunction',
+    'compile_function',
+    'import_reference',
+    'LoopFactory',
+    'new_event_loop_factory',
+    'get_or_create_event_loop',
 )
 
+LoopFactory = Callable[[], AbstractEventLoop]
+
 
 async def resolve_function(func: Callable[..., Any], *args, **kwargs) -> Any:  # type: ignore
     if iscoroutinefunction(func):
@@ -16,3 +39,115 @@ async def resolve_function(func: Callable[..., Any], *args, **kwargs) -> Any:  #
 
 def resolve_coroutine(func: Callable[..., Coroutine[Any, Any, Any]], *args, **kwargs) -> Any:  # type: ignore
     return get_event_loop_policy().get_event_loop().run_until_complete(func(*args, **kwargs))
+
+
+class CompiledFunction(NamedTuple):
+    func: Callable[..., Any]
+    is_coroutine: bool
+    parameters: Tuple[Parameter, ...]
+    is_generator: bool = False
+    is_async_generator: bool = False
+
+    async def __call__(self, *args, **kwargs) -> Any:  # type: ignore
+        if self.is_coroutine:
+            return await self.func(*args, **kwargs)
+        return self.func(*args, **kwargs)
+
+    async def call_in_executor(self, executor: Optional[Executor], *args, **kwargs) -> Any:  # type: ignore
+        if executor is None or self.is_coroutine or self.is_generator or self.is_async_generator:
+            return await self(*args, **kwargs)
+        if isinstance(executor, ProcessPoolExecutor):
+            return await get_running_loop().run_in_executor(executor, partial(self.func, *args, **kwargs))
+        return await _run_in_executor(executor, self.func, *args, **kwargs)
+
+
+async def _run_in_executor(executor: Optional[Executor], func: Callable[..., Any], *args, **kwargs) -> Any:  # type: ignore
+    # inline without executor, threads keep the caller context (e.g. the current invocation)
+    if executor is None:
+        return func(*args, **kwargs)
+    return await get_running_loop().run_in_executor(executor, partial(copy_context().run, func, *args, **kwargs))
+
+
+def compile_function(func: Callable[..., Any]) -> CompiledFunction:
+    return CompiledFunction(
+        func=func,
+        is_coroutine=iscoroutinefunction(func),
+        parameters=tuple(signature(func).parameters.values()),
+        is_generator=isgeneratorfunction(func),
+        is_async_generator=isasyncgenfunction(func),
+    )
+
+
+def import_reference(reference: str, default_attribute: Optional[str] = None) -> Any:
+    # "package.module:attribute.path"
+    module_name, _, attribute = reference.partition(':')
+    attribute = attribute or default_attribute or ''
+    if not module_name or not attribute:
+        raise ValueError('Invalid reference "{0}", expected "package.module:attribute"'.format(reference))
+    value: Any = import_module(module_name)
+    for name in attribute.split('.'):
+        value = getattr(value, name)
+    return value
+
+
+def _uvloop_new_event_loop(required: bool) -> Optional[LoopFactory]:
+    try:
+        return cast(LoopFactory, import_module('uvloop').new_event_loop)
+    except ImportError:
+        if required:
+            raise
+        return None
+
+
+def new_event_loop_factory(
+    *,
+    uvloop: Optional[bool] = None,  # None means use it when installed
+    default_executor_workers: Optional[int] = None,
+    eager_tasks: bool = False,  # only available on Python 3.12+
+    debug: Optional[bool] = None,
+) -> LoopFactory:
+    uvloop_new_event_loop = None if uvloop is False else _uvloop_new_event_loop(required=bool(uvloop))
+    eager_task_factory = getattr(asyncio, 'eager_task_factory', None) if eager_tasks else None
+
+    def factory() -> AbstractEventLoop:
+        loop = uvloop_new_event_loop() if uvloop_new_event_loop else new_event_loop()
+        if default_executor_workers is not None:
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=default_executor_workers))
+        if eager_task_factory is not None:
+            loop.set_task_factory(eager_task_factory)
+        if debug is not None:
+            loop.set_debug(debug)
+        return loop
+
+    return factory
+
+
+def _get_event_loop() -> Optional[AbstractEventLoop]:
+    # current event loop of the thread, without the deprecation warning of asyncio.get_event_loop()
+    with catch_warnings():
+        simplefilter('ignore', DeprecationWarning)
+        with suppress(RuntimeError):
+            return get_event_loop_policy().get_event_loop()
+    return None
+
+
+def _get_current_event_loop() -> Optional[AbstractEventLoop]:
+    # like _get_event_loop, but never creates one, the default policies create a loop in the main thread when none
+    # has been set yet, other policies are asked
+    local = getattr(get_event_loop_policy(), '_local', None)
+    if local is not None and hasattr(local, '_loop'):
+        return cast(Optional[AbstractEventLoop], local._loop)
+    return _get_event_loop()
+
+
+def get_or_create_event_loop(loop_factory: Optional[LoopFactory] = None) -> AbstractEventLoop:
+    # replacement for the deprecated asyncio.get_event_loop() fallback outside of a running loop
+    try:
+        return get_running_loop()
+    except RuntimeError:
+        pass
+    loop = None if loop_factory is not None else _get_event_loop()
+    if loop is None or loop.is_closed():
+        loop = (loop_factory or new_event_loop)()
+        set_event_loop(loop)
+    return loop
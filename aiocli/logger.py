@@ -1,3 +1,47 @@
-from logging import getLogger
+from logging import Handler, StreamHandler, getLogger
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Tuple
+
+__all__ = (
+    # logger
+    'logger',
+    'enable_queue_logging',
+)
 
 logger = getLogger('aiocli')
+
+
+class _QueueListener(QueueListener):
+    # restores the handlers and propagation of the logger once stopped
+    def __init__(self, queue: 'SimpleQueue[Any]', *handlers: Handler, respect_handler_level: bool) -> None:
+        super().__init__(queue, *handlers, respect_handler_level=respect_handler_level)
+        self._queue_handler = QueueHandler(queue)
+        self._previous: Tuple[Tuple[Handler, ...], bool] = (tuple(logger.handlers), logger.propagate)
+
+    def start(self) -> None:
+        for handler in self.handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(self._queue_handler)
+        logger.propagate = False  # otherwise the handlers of the ancestors still run on the event loop
+        super().start()
+
+    def stop(self) -> None:
+        super().stop()
+        logger.removeHandler(self._queue_handler)
+        handlers, logger.propagate = self._previous
+        for handler in handlers:
+            logger.addHandler(handler)
+
+
+def enable_queue_logging(*handlers: Handler, respect_handler_level: bool = True) -> QueueListener:
+    # records are handed over to a background thread, so slow handlers do not stall the event loop, by default the
+    # handlers of the logger, or of the root logger it propagates to (e.g. logging.basicConfig), are moved behind it
+    if not handlers:
+        handlers = (
+            tuple(logger.handlers) or (tuple(getLogger().handlers) if logger.propagate else ()) or (StreamHandler(),)
+        )
+    queue: 'SimpleQueue[Any]' = SimpleQueue()
+    listener = _QueueListener(queue, *handlers, respect_handler_level=respect_handler_level)
+    listener.start()
+    return listener
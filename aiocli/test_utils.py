@@ -1,10 +1,11 @@
 import sys
-from asyncio import AbstractEventLoop, TimeoutError, get_event_loop, wait_for
+from asyncio import AbstractEventLoop, TimeoutError, wait_for
 from types import TracebackType
 from typing import Any, Callable, List, Optional, Type, Union
 
 from aiocli.commander import AppRunner
 from aiocli.commander_app import Application
+from aiocli.helpers import LoopFactory, get_or_create_event_loop
 
 
 class TestCommander:
@@ -20,11 +21,12 @@ class TestCommander:
         app: Union[Application, Callable[[], Application]],
         *,
         loop: Optional[AbstractEventLoop] = None,
+        loop_factory: Optional[LoopFactory] = None,
         all_hooks: bool = True,
         ignore_internal_hooks: bool = False,
     ) -> None:
         self._app = app if isinstance(app, Application) else app()
-        self._loop = loop or get_event_loop()
+        self._loop = loop or get_or_create_event_loop(loop_factory)
         self._runner = None
         self._all_hooks = all_hooks
         self._ignore_internal_hooks = ignore_internal_hooks
@@ -0,0 +1,6 @@
+from benchmarks import dispatch, loops, registration
+
+if __name__ == '__main__':
+    registration.main()
+    dispatch.main()
+    loops.main()
@@ -0,0 +1,74 @@
+from asyncio import iscoroutinefunction, new_event_loop
+from inspect import signature
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+
+from aiocli.commander_app import Application, Command, Depends, State
+
+
+def get_config() -> Dict[str, Any]:
+    return {'debug': False}
+
+
+async def get_session(config: Dict[str, Any] = Depends(get_config, cache=False)) -> object:
+    return object()
+
+
+async def before(cmd: Command, kwargs: Dict[str, Any]) -> None:
+    pass
+
+
+def after(cmd: Command, kwargs: Dict[str, Any], app: Application) -> None:
+    pass
+
+
+async def handle(
+    name: str,
+    state: State,
+    config: Dict[str, Any] = Depends(get_config, cache=False),
+    session: object = Depends(get_session, cache=False),
+) -> int:
+    return 0
+
+
+def create_app() -> Application:
+    app = Application(middleware=[before, before], after_middleware=[after])
+    app.command(name='greet', positionals=[('name', {'type': str})])(handle)
+    return app
+
+
+def introspection(callables: List[Callable[..., Any]]) -> None:
+    # what the dispatcher used to do per call before commands were compiled into plans
+    for func in callables:
+        _ = signature(func).parameters
+        _ = iscoroutinefunction(func)
+
+
+def main(iterations: int = 20_000) -> None:
+    app = create_app()
+    loop = new_event_loop()
+    argv = ['greet', 'World']
+    loop.run_until_complete(app(argv))  # warm-up, compiles the plan
+
+    async def dispatch() -> None:
+        for _ in range(iterations):
+            await app(argv)
+
+    start = perf_counter()
+    loop.run_until_complete(dispatch())
+    dispatch_elapsed = (perf_counter() - start) / iterations
+    loop.close()
+
+    callables: List[Callable[..., Any]] = [before, before, handle, get_config, get_session, get_config, after]
+    start = perf_counter()
+    for _ in range(iterations):
+        introspection(callables)
+    introspection_elapsed = (perf_counter() - start) / iterations
+
+    print('Command dispatch ({0} iterations):'.format(iterations))
+    print('  dispatch with compiled plan:         {0:>8.2f} us/call'.format(dispatch_elapsed * 1_000_000))
+    print('  per-call introspection saved by plan: {0:>7.2f} us/call'.format(introspection_elapsed * 1_000_000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import sys
+from time import perf_counter
+from typing import List, Tuple
+
+from aiocli.helpers import LoopFactory, new_event_loop_factory
+from benchmarks.dispatch import create_app
+
+
+def _loop_factories() -> List[Tuple[str, LoopFactory]]:
+    factories = [('asyncio', new_event_loop_factory(uvloop=False))]
+    if sys.version_info >= (3, 12):  # eager tasks are ignored before
+        factories.append(('asyncio + eager tasks', new_event_loop_factory(uvloop=False, eager_tasks=True)))
+    try:
+        factories.append(('uvloop', new_event_loop_factory(uvloop=True)))
+    except ImportError:
+        pass
+    return factories
+
+
+def main(iterations: int = 20_000) -> None:
+    argv = ['greet', 'World']
+    print('Event loop dispatch ({0} iterations):'.format(iterations))
+    for name, loop_factory in _loop_factories():
+        app = create_app()
+        loop = loop_factory()
+
+        async def dispatch() -> None:
+            for _ in range(iterations):
+                await app(argv)
+
+        loop.run_until_complete(app(argv))  # warm-up, compiles the plan
+        start = perf_counter()
+        loop.run_until_complete(dispatch())
+        elapsed = (perf_counter() - start) / iterations
+        loop.close()
+        print('  {0:<24} {1:>8.2f} us/call'.format(name + ':', elapsed * 1_000_000))
+
+
+if __name__ == '__main__':
+    main()
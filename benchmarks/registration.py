@@ -0,0 +1,41 @@
+from time import perf_counter
+from typing import Sequence
+
+from aiocli.commander_app import Application, CommandArgument, command
+
+
+def _handler(name: str) -> int:
+    return 0
+
+
+def measure(size: int) -> float:
+    commands = [
+        command(
+            name='command-{0}'.format(index),
+            handler=_handler,
+            positionals=[CommandArgument(name_or_flags='name', help='The name')],
+            description='Command number {0}'.format(index),
+        )
+        for index in range(size)
+    ]
+    start = perf_counter()
+    app = Application(commands=commands)
+    elapsed = perf_counter() - start
+    assert len(app.parser.format_help()) > 0
+    return elapsed
+
+
+def main(sizes: Sequence[int] = (1_000, 2_500, 5_000, 10_000)) -> None:
+    measure(100)  # warm-up
+    print('Application construction (registration only):')
+    for size in sizes:
+        elapsed = measure(size)
+        print(
+            '  {0:>6} commands: {1:>8.2f} ms ({2:.2f} us/command)'.format(
+                size, elapsed * 1_000, elapsed * 1_000_000 / size
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
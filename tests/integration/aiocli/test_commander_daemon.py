@@ -0,0 +1,31 @@
+from asyncio import get_running_loop
+from pathlib import Path
+from platform import system
+
+from pytest import mark
+
+from aiocli.commander_app import Application
+from aiocli.commander_daemon import request_daemon, start_app_server
+
+
+@mark.skipif(system() == 'Windows', reason='Unix sockets are not available')
+async def test_daemon_executes_argv_sent_by_the_client(tmp_path: Path) -> None:
+    app = Application(default_exit_code=0)
+
+    @app.command(name='greet:to', positionals=[('--name', {'default': 'World!'})])
+    def handle(name: str) -> int:
+        print('Hello {0}'.format(name))
+        return 0 if name == 'test' else 1
+
+    path = str(tmp_path / 'aiocli.sock')
+    server = await start_app_server(app, path=path)
+    loop = get_running_loop()
+    try:
+        ok = await loop.run_in_executor(None, request_daemon, path, ['greet:to', '--name', 'test'])
+        ko = await loop.run_in_executor(None, request_daemon, path, ['greet:to'])
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    assert ok.exit_code == 0 and ok.stdout == 'Hello test\n'
+    assert ko.exit_code == 1 and ko.stdout == 'Hello World!\n'
@@ -1,11 +1,20 @@
-from asyncio import AbstractEventLoop
+from asyncio import (
+    AbstractEventLoop,
+    DefaultEventLoopPolicy,
+    get_event_loop_policy,
+    get_running_loop,
+    new_event_loop,
+    set_event_loop,
+    set_event_loop_policy,
+)
 from platform import system
-from typing import Optional
+from typing import List, Optional
 from unittest.mock import Mock
 
 # noinspection PyProtectedMembers
-from aiocli.commander import AppRunner, GracefulExit, _raise_graceful_exit
+from aiocli.commander import AppRunner, GracefulExit, _raise_graceful_exit, run_app
 from aiocli.commander_app import Application
+from aiocli.helpers import new_event_loop_factory
 from tests.conftest import amock
 
 
@@ -44,3 +53,76 @@ async def test_app_runner_setup_and_cleanup(event_loop: AbstractEventLoop) -> No
         application_mock.cleanup.assert_called_once()
         application_mock.exit.assert_called_once()
         assert error_code == 0
+
+
+def test_run_app_uses_the_loop_factory() -> None:
+    loops: List[AbstractEventLoop] = []
+
+    def loop_factory() -> AbstractEventLoop:
+        loops.append(new_event_loop())
+        return loops[-1]
+
+    app = Application()
+    running: List[AbstractEventLoop] = []
+
+    @app.command(name='loop')
+    async def handle() -> int:
+        running.append(get_running_loop())
+        return 0
+
+    exit_code = run_app(app, loop_factory=loop_factory, argv=['loop'], handle_signals=False, exit_code=False)
+
+    assert exit_code == 0
+    assert running == loops
+    assert loops[0].is_closed()
+
+
+def test_run_app_keeps_the_current_event_loop() -> None:
+    previous = get_event_loop_policy().get_event_loop()
+    loop = new_event_loop()
+    set_event_loop(loop)
+    app = Application()
+
+    @app.command(name='loop')
+    async def handle() -> int:
+        return 0 if get_running_loop() is not loop else 1
+
+    try:
+        assert run_app(app, argv=['loop'], handle_signals=False, exit_code=False) == 0
+        assert get_event_loop_policy().get_event_loop() is loop
+    finally:
+        set_event_loop(previous)
+        loop.close()
+
+
+def test_run_app_does_not_leave_an_event_loop_open() -> None:
+    loops: List[AbstractEventLoop] = []
+
+    class EventLoopPolicy(DefaultEventLoopPolicy):
+        def new_event_loop(self) -> AbstractEventLoop:
+            loops.append(super().new_event_loop())
+            return loops[-1]
+
+    previous = get_event_loop_policy()
+    set_event_loop_policy(EventLoopPolicy())  # no current event loop yet
+    app = Application()
+
+    @app.command(name='loop')
+    async def handle() -> int:
+        return 0
+
+    try:
+        assert run_app(app, argv=['loop'], handle_signals=False, exit_code=False) == 0
+    finally:
+        set_event_loop_policy(previous)
+
+    assert loops and all(loop.is_closed() for loop in loops)
+
+
+def test_new_event_loop_factory_configures_the_loop() -> None:
+    loop = new_event_loop_factory(uvloop=False, default_executor_workers=1, debug=True)()
+    try:
+        assert loop.get_debug()
+        assert loop.run_until_complete(loop.run_in_executor(None, sum, [1, 2])) == 3
+    finally:
+        loop.close()
@@ -1,9 +1,35 @@
-from typing import Any, Dict, Optional
+import sys
+from asyncio import Event, gather, sleep, wait_for
+from os import getpid
+from threading import get_ident
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    cast,
+)
 from unittest.mock import Mock
 
-from pytest import mark
+from pytest import CaptureFixture, mark, raises, warns
 
-from aiocli.commander_app import Application, Command, command
+from aiocli.commander_app import (
+    Application,
+    Command,
+    Depends,
+    State,
+    _DependenciesCache,
+    command,
+    hook,
+)
+
+
+def get_process_id(_: int) -> int:
+    return getpid()
 
 
 def test_application_include_router() -> None:
@@ -128,3 +154,555 @@ async def test_application_execute_exception_handler_and_return_specific_exit_co
         raise ValueError('Test')
 
     assert await app.__call__(['test']) == 3
+
+
+def test_application_builds_command_parser_lazily() -> None:
+    app = Application()
+
+    @app.command(name='test', positionals=[('name', {'type': str})])
+    def handle(name: str) -> int:
+        return 0
+
+    assert 'test' not in app._parsers
+
+    parser = app.get_parser(command_name='test')
+
+    assert parser is not None
+    assert parser is app.get_parser(command_name='test')
+    assert app.get_parser(command_name='missing') is None
+
+
+def test_application_renders_help_description_only_when_help_is_formatted() -> None:
+    app = Application(description='lazy', color=False, commands=[command(name='one', handler=lambda: 0)])
+    app.add_commands([command(name='two', handler=lambda: 0, description='The second one')])
+
+    assert app.parser.description == 'lazy'
+
+    help_ = app.parser.format_help()
+
+    assert 'Available commands:' in help_
+    assert 'one' in help_
+    assert 'two  The second one' in help_
+    assert app.parser.format_help() == help_
+
+
+def test_application_include_routers_in_a_single_pass() -> None:
+    routers = [
+        Application(
+            title='router-{0}'.format(index),
+            middleware=[Mock()],
+            after_middleware=[Mock()],
+            exception_handlers={type('Error{0}'.format(index), (Exception,), {}): Mock()},
+            on_startup=[Mock()],
+            on_shutdown=[Mock()],
+            on_cleanup=[Mock()],
+            commands=[command(name='command-{0}'.format(index), handler=lambda: 0)],
+        )
+        for index in range(3)
+    ]
+    app = Application(color=False)
+
+    app.include_routers(routers)
+
+    assert [app.get_command(name='command-{0}'.format(index)) for index in range(3)] == [
+        router.get_command(name='command-{0}'.format(index)) for index, router in enumerate(routers)
+    ]
+    assert app._before_middleware == [router._before_middleware[0] for router in routers]
+    assert app._after_middleware == [router._after_middleware[0] for router in routers]
+    assert len(app._exception_handlers) == 3
+    assert app.on_startup == [router.on_startup[0] for router in routers]
+    assert app.on_shutdown == [router.on_shutdown[0] for router in routers]
+    assert app.on_cleanup == [router.on_cleanup[0] for router in routers]
+    assert all(' router-{0}\n  command-{0}'.format(index) in app.parser.format_help() for index in range(3))
+
+
+async def test_application_reuses_command_dispatch_plan() -> None:
+    calls = []
+
+    def get_value() -> int:
+        return 1
+
+    app = Application(state={'value': 2})
+
+    @app.middleware()
+    async def before(cmd: Command, kwargs: Dict[str, Any]) -> None:
+        calls.append(('before', kwargs['value'], kwargs['state']['value']))
+
+    @app.command(name='test')
+    def handle(state: State, value: int = Depends(get_value, cache=False)) -> int:
+        calls.append(('handle', value, state['value']))
+        return 0
+
+    assert await app.__call__(['test']) == 0
+    plan = app._get_command_plan('test')
+    assert await app.__call__(['test']) == 0
+
+    assert app._get_command_plan('test') is plan
+    assert calls == [('before', 1, 2), ('handle', 1, 2)] * 2
+
+    app.add_middleware([lambda: None], after=True)
+
+    assert app._get_command_plan('test') is not plan
+    assert len(app._get_command_plan('test').after_middleware) == 1
+
+
+async def test_application_resolves_independent_dependencies_concurrently() -> None:
+    created = []
+    first_started = Event()
+
+    async def get_shared() -> object:
+        created.append('shared')
+        await sleep(0)
+        return object()
+
+    async def get_first(shared: object = Depends(get_shared)) -> object:
+        first_started.set()
+        return shared
+
+    async def get_second(shared: object = Depends(get_shared)) -> object:
+        await wait_for(first_started.wait(), timeout=1)  # would time out if resolved before get_first
+        return shared
+
+    app = Application()
+
+    @app.command(name='test')
+    def handle(second: object = Depends(get_second), first: object = Depends(get_first, cache=False)) -> int:
+        return 0 if first is second else 1
+
+    assert await app.__call__(['test']) == 0
+    assert created == ['shared']
+
+
+async def test_application_dependency_cache_scopes() -> None:
+    counters = {'invocation': 0, 'application': 0, 'ttl': 0}
+
+    def per_invocation() -> int:
+        counters['invocation'] += 1
+        return counters['invocation']
+
+    def per_application() -> int:
+        counters['application'] += 1
+        return counters['application']
+
+    def with_ttl() -> int:
+        counters['ttl'] += 1
+        return counters['ttl']
+
+    app = Application()
+
+    @app.command(name='test')
+    def handle(
+        a: int = Depends(per_invocation, scope='invocation'),
+        b: int = Depends(per_application),
+        c: int = Depends(with_ttl, ttl=0),
+    ) -> int:
+        return 0
+
+    await app.__call__(['test'])
+    await app.__call__(['test'])
+    assert counters == {'invocation': 2, 'application': 1, 'ttl': 2}
+
+    app.invalidate_dependencies(per_application)
+    await app.__call__(['test'])
+    assert counters == {'invocation': 3, 'application': 2, 'ttl': 3}
+
+
+async def test_application_creates_application_dependencies_once_for_concurrent_calls() -> None:
+    pools = []
+
+    async def get_pool() -> object:
+        await sleep(0.01)
+        pools.append(object())
+        return pools[-1]
+
+    app = Application()
+
+    @app.command(name='t')
+    def handle(pool: object = Depends(get_pool)) -> int:
+        return 0 if pool is pools[0] else 1
+
+    assert await gather(*[app.__call__(['t']) for _ in range(5)]) == [0] * 5
+    assert len(pools) == 1
+
+
+def test_dependencies_cache_evicts_least_recently_used() -> None:
+    cache = _DependenciesCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert len(cache) == 2
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+async def test_application_tears_down_generator_dependencies_after_the_after_middleware() -> None:
+    events = []
+
+    def get_sync() -> Iterator[str]:
+        events.append('sync setup')
+        yield 'sync'
+        events.append('sync teardown')
+
+    async def get_async() -> AsyncIterator[str]:
+        events.append('async setup')
+        yield 'async'
+        events.append('async teardown')
+
+    app = Application(after_middleware=[lambda: events.append('after middleware')])
+
+    @app.command(name='test')
+    def handle(a: str = Depends(get_sync), b: str = Depends(get_async)) -> int:
+        events.append('handle {0} {1}'.format(a, b))
+        return 0
+
+    assert await app.__call__(['test']) == 0
+    assert events[-4:-2] == ['handle sync async', 'after middleware']
+    assert sorted(events[-2:]) == ['async teardown', 'sync teardown']
+
+    events.clear()
+    await app.__call__(['test'])
+    assert 'sync setup' in events and 'async setup' in events
+
+
+async def test_application_cancels_pending_dependencies_when_one_fails() -> None:
+    events = []
+
+    async def get_slow() -> AsyncIterator[str]:
+        await sleep(0.05)
+        events.append('setup')
+        yield 'slow'
+        events.append('teardown')
+
+    async def get_failing() -> str:
+        events.append('error')
+        raise ValueError('failing')
+
+    app = Application()
+
+    @app.command(name='test')
+    def handle(slow: str = Depends(get_slow), failing: str = Depends(get_failing)) -> int:
+        return 0
+
+    with raises(ValueError):
+        await app.__call__(['test'])
+    await sleep(0.1)
+    assert events == ['error']
+
+
+async def test_application_raises_the_error_of_a_branch_sharing_a_dependency() -> None:
+    async def get_shared() -> str:
+        await sleep(0.01)
+        return 'shared'
+
+    async def get_boom() -> str:
+        raise ValueError('boom')
+
+    def get_y(shared: str = Depends(get_shared)) -> str:
+        return shared
+
+    def get_x(shared: str = Depends(get_shared), boom: str = Depends(get_boom)) -> str:
+        return shared
+
+    app = Application()
+
+    @app.command(name='t')
+    def handle(y: str = Depends(get_y), x: str = Depends(get_x)) -> int:
+        return 0
+
+    with raises(ValueError, match='boom'):  # not the cancellation of the dependency shared with the other branch
+        await app.__call__(['t'])
+
+
+async def test_application_reuses_pooled_dependencies_between_invocations() -> None:
+    connections = []
+    closed = []
+
+    async def get_connection() -> AsyncIterator[object]:
+        connection = object()
+        connections.append(connection)
+        yield connection
+        closed.append(connection)
+
+    app = Application()
+
+    @app.command(name='test')
+    def handle(connection: object = Depends(get_connection, pool_size=1)) -> int:
+        return 0
+
+    await app.__call__(['test'])
+    await app.__call__(['test'])
+
+    assert len(connections) == 1
+    assert closed == []
+
+    await app.cleanup()
+
+    assert closed == connections
+
+
+async def test_application_does_not_format_debug_messages_when_debug_is_disabled() -> None:
+    class Unprintable:
+        def __str__(self) -> str:
+            raise AssertionError('Debug message formatted')
+
+    app = Application(debug=False)
+
+    @app.command(name='test')
+    def handle(value: Unprintable = Unprintable()) -> int:
+        return 0
+
+    assert await app.__call__(['test']) == 0
+
+
+async def test_application_concurrent_calls_do_not_share_invocation_state() -> None:
+    app = Application(default_exit_code=0)
+
+    @app.command(name='test', positionals=[('code', {'type': int})])
+    async def handle(code: int) -> int:
+        await sleep(0.01 * (3 - code))
+        assert app.get_raw_input() == ((code,), {})
+        return code
+
+    responses = await gather(*[app.__call__(['test', str(code)], raw_input=((code,), {})) for code in range(3)])
+
+    assert responses == [0, 1, 2]
+    assert app.exit_code == 0  # the last one to finish
+
+
+async def test_application_runs_sync_callables_in_the_execution_policy_executor() -> None:
+    threads = {}
+
+    def get_thread() -> int:
+        return get_ident()
+
+    app = Application(execution_policy='thread', max_workers=2)
+
+    @app.middleware()
+    def before(cmd: Command) -> None:
+        threads['{0} middleware'.format(cmd.name)] = get_ident()
+
+    @app.command(name='thread')
+    def handle_thread(dependency: int = Depends(get_thread, cache=False)) -> int:
+        threads['dependency'] = dependency
+        threads['handler'] = get_ident()
+        return 0
+
+    @app.command(name='inline', execution_policy='inline')
+    def handle_inline() -> int:
+        threads['inline'] = get_ident()
+        return 0
+
+    assert await app.__call__(['thread']) == 0
+    assert await app.__call__(['inline']) == 0
+
+    assert threads['inline'] == threads['inline middleware'] == get_ident()
+    assert get_ident() not in (threads['thread middleware'], threads['dependency'], threads['handler'])
+    assert app._get_executor('thread') is app._get_executor('thread')
+
+    await app.cleanup()
+    assert app._executors == {}
+
+
+async def test_application_runs_sync_generators_and_exception_handlers_in_the_execution_policy_executor(
+    capsys: CaptureFixture[str],
+) -> None:
+    threads: Dict[str, int] = {}
+
+    def get_resource() -> Iterator[int]:
+        threads['setup'] = get_ident()
+        yield 1
+        threads['teardown'] = get_ident()
+
+    app = Application(execution_policy='thread')
+
+    @app.command(name='records', output_format='jsonl')
+    def handle_records(resource: int = Depends(get_resource, cache=False)) -> Iterator[Dict[str, int]]:
+        threads['records'] = get_ident()
+        yield {'resource': resource}
+
+    @app.command(name='fail')
+    def handle_fail() -> int:
+        raise ValueError('fail')
+
+    @app.exception_handler(ValueError)
+    def handle_error(err: BaseException, cmd: Command, kwargs: Dict[str, Any]) -> int:
+        threads['exception handler'] = get_ident()
+        return 3
+
+    await app.__call__(['records'])
+    assert await app.__call__(['fail']) == 3
+
+    assert capsys.readouterr().out == '{"resource": 1}\n'
+    assert get_ident() not in threads.values() and len(threads) == 4
+    await app.cleanup()
+
+
+async def test_application_runs_process_policy_handlers_in_a_process_pool() -> None:
+    app = Application(override_return=True, execution_policy='process', max_workers=1)
+    app.add_commands([command(name='pid', handler=get_process_id, positionals=[('_', {'type': int})])])
+
+    try:
+        assert await app.__call__(['pid', '0']) != getpid()
+    finally:
+        await app.cleanup()
+
+
+async def test_application_cancels_commands_past_their_deadline() -> None:
+    cancelled = Event()
+    budgets: Dict[str, Optional[float]] = {}
+    app = Application(timeout=5)
+
+    def get_budget() -> Optional[float]:
+        return app.get_remaining_time()
+
+    @app.command(name='slow', timeout=0.05, timeout_exit_code=3)
+    async def handle_slow(budget: Optional[float] = Depends(get_budget, cache=False)) -> int:
+        budgets['slow'] = budget
+        try:
+            await sleep(10)
+        finally:
+            cancelled.set()
+        return 0
+
+    @app.command(name='fast')
+    async def handle_fast(budget: Optional[float] = Depends(get_budget, cache=False)) -> int:
+        budgets['fast'] = budget
+        return 0
+
+    @app.command(name='raises')
+    async def handle_raises() -> int:
+        raise TimeoutError()
+
+    @app.command(name='inner', timeout=10)
+    async def handle_inner() -> int:
+        await wait_for(sleep(1), timeout=0.01)
+        return 0
+
+    assert await app.__call__(['slow']) == 3
+    assert cancelled.is_set()
+    assert await app.__call__(['fast']) == 0
+    assert 0 < cast(float, budgets['slow']) <= 0.05
+    assert 0.05 < cast(float, budgets['fast']) <= 5
+    assert app.get_remaining_time() is None
+    with raises(TimeoutError):
+        await app.__call__(['raises'])
+    with raises(TimeoutError):
+        await app.__call__(['inner'])
+
+
+async def test_application_runs_independent_hooks_concurrently() -> None:
+    events: List[str] = []
+    connected = Event()
+
+    async def connect_db() -> None:
+        await sleep(0.01)
+        connected.set()
+        events.append('db')
+
+    async def warm_cache() -> None:
+        await wait_for(connected.wait(), timeout=1)  # only finishes if it runs next to connect_db
+        events.append('cache')
+
+    def migrate() -> None:
+        events.append('migrate')
+
+    def ready() -> None:
+        events.append('ready')
+
+    app = Application(
+        on_startup=[hook(connect_db, name='db'), hook(warm_cache), hook(migrate, after=['db']), ready],
+    )
+    await app.startup()
+
+    assert events[-1] == 'ready'
+    assert events.index('db') < events.index('migrate')
+    assert set(events) == {'db', 'cache', 'migrate', 'ready'}
+
+    app.on_startup.append(hook(ready, after=['missing']))
+    with raises(ValueError):
+        await app.startup()
+
+
+async def test_application_imports_lazy_command_handlers_on_dispatch() -> None:
+    reference = 'tests.unit.aiocli.lazy_commands'
+    sys.modules.pop(reference, None)
+    app = Application(
+        override_return=True,
+        commands=[
+            command(
+                name='add',
+                handler='{0}:add'.format(reference),
+                positionals=[('a', {'type': int}), ('b', {'type': int})],
+            ),
+            command(name='missing', handler='{0}:missing'.format(reference)),
+        ],
+    )
+    app.get_parser('add')
+
+    assert reference not in sys.modules
+    assert await app.__call__(['add', '1', '2']) == 3
+    assert reference in sys.modules
+    with raises(AttributeError):
+        await app.__call__(['missing'])
+
+
+async def test_application_routes_prefixed_routers_through_the_command_trie() -> None:
+    calculator = Application(title='calculator')
+
+    @calculator.command(name='div', positionals=[('a', {'type': int}), ('b', {'type': int})])
+    def handle_div(a: int, b: int) -> int:
+        return a // b
+
+    @calculator.command(name='diff', positionals=[('a', {'type': int}), ('b', {'type': int})])
+    def handle_diff(a: int, b: int) -> int:
+        return a - b
+
+    app = Application(override_return=True, abbreviations=True)
+
+    @app.command(name='div')
+    def handle_root_div() -> int:
+        return -1
+
+    app.include_router(calculator, prefix='calculator')
+    with warns(UserWarning):
+        app.include_router(calculator, prefix='calculator')
+
+    assert await app.__call__(['calculator', 'div', '6', '3']) == 2
+    assert 'calculator diff' not in app._parsers  # only the dispatched command parser is built
+    assert await app.__call__(['calc', 'dif', '6', '3']) == 3
+    assert await app.__call__(['div']) == -1
+    assert app.get_command('div') is not app.get_command('calculator div')
+    assert app._route_command(['calculator', 'di', '1']) == ('calculator', ['di', '1'])  # ambiguous
+
+
+async def test_application_around_middleware_wraps_and_short_circuits_the_handler() -> None:
+    events: List[str] = []
+    cache: Dict[int, Any] = {}
+    app = Application(override_return=True, middleware=[lambda: events.append('before')])
+
+    @app.around_middleware()
+    async def trace(cmd: Command, kwargs: Dict[str, Any], call_next: Callable[[], Awaitable[Any]]) -> Any:
+        events.append('enter')
+        response = await call_next()
+        events.append('exit')
+        return response
+
+    @app.around_middleware()
+    async def memoize(cmd: Command, kwargs: Dict[str, Any], call_next: Callable[[], Awaitable[Any]]) -> Any:
+        if kwargs['n'] not in cache:
+            cache[kwargs['n']] = await call_next()
+        return cache[kwargs['n']]
+
+    @app.command(name='square', positionals=[('n', {'type': int})])
+    def handle(n: int) -> int:
+        events.append('handler')
+        return n * n
+
+    assert await app.__call__(['square', '3']) == 9
+    assert await app.__call__(['square', '3']) == 9
+    assert events == ['enter', 'before', 'handler', 'exit', 'enter', 'exit']
+    assert app._get_command_plan('square').pipeline is app._get_command_plan('square').pipeline
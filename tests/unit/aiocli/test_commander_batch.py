@@ -0,0 +1,93 @@
+from asyncio import sleep
+from io import StringIO
+from json import loads
+from threading import Event
+from typing import Iterator, List
+
+from pytest import raises
+
+from aiocli.commander_app import Application
+from aiocli.commander_batch import read_batch, run_batch
+
+
+def test_read_batch_supports_json_lines_and_shell_like_lines() -> None:
+    lines = ['["greet", "--name", "John Doe"]\n', '\n', '# comment\n', "greet --name 'Jane Doe'\n"]
+
+    assert list(read_batch(lines)) == [['greet', '--name', 'John Doe'], ['greet', '--name', 'Jane Doe']]
+
+
+async def test_run_batch_reports_invalid_lines_and_keeps_going() -> None:
+    app = Application()
+
+    @app.command(name='sleep')
+    async def handle() -> int:
+        await sleep(0.01)
+        return 0
+
+    report = StringIO()
+    lines = ['sleep\n', '["bad", 1]\n', "sleep 'unbalanced\n", 'sleep\n']
+    result = await run_batch(app, read_batch(lines), concurrency=2, report=report)
+
+    assert [(item.position, item.exit_code) for item in result.results] == [(0, 0), (1, 1), (2, 1), (3, 0)]
+    assert 'expected a list of strings' in str(result.results[1].error)
+    assert loads(report.getvalue().splitlines()[-1]) == {'total': 4, 'failed': 2}
+
+
+async def test_run_batch_awaits_commands_in_flight_when_reading_fails() -> None:
+    finished: List[int] = []
+    app = Application()
+
+    @app.command(name='sleep')
+    async def handle() -> int:
+        await sleep(0.01)
+        finished.append(0)
+        return 0
+
+    def batch() -> Iterator[List[str]]:
+        yield ['sleep']
+        yield ['sleep']
+        raise OSError('read error')
+
+    with raises(OSError):
+        await run_batch(app, batch(), concurrency=2)
+    assert finished == [0, 0]
+
+
+async def test_run_batch_bounds_concurrency_and_reports_exit_codes() -> None:
+    in_flight = {'current': 0, 'max': 0}
+    app = Application()
+
+    @app.command(name='sleep', positionals=[('code', {'type': int})])
+    async def handle(code: int) -> int:
+        in_flight['current'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['current'])
+        await sleep(0.01)
+        in_flight['current'] -= 1
+        return code
+
+    report = StringIO()
+    result = await run_batch(app, [['sleep', str(code % 2)] for code in range(6)], concurrency=2, report=report)
+
+    assert in_flight['max'] == 2
+    assert [item.exit_code for item in result.results] == [0, 1, 0, 1, 0, 1]
+    assert result.failed == 3 and result.exit_code == 1
+    assert loads(report.getvalue().splitlines()[-1]) == {'total': 6, 'failed': 3}
+
+
+async def test_run_batch_reads_commands_off_the_event_loop() -> None:
+    handled = Event()
+    app = Application()
+
+    @app.command(name='mark')
+    async def handle() -> int:
+        handled.set()
+        return 0
+
+    def batch() -> Iterator[List[str]]:
+        yield ['mark']
+        assert handled.wait(timeout=1)  # the first command runs while the next line is awaited
+        yield ['mark']
+
+    result = await run_batch(app, batch())
+
+    assert [item.exit_code for item in result.results] == [0, 0]
@@ -0,0 +1,122 @@
+import os
+import sys
+from asyncio import Event, gather
+from asyncio import sleep as async_sleep
+from pathlib import Path
+from time import sleep
+from typing import Any, Dict
+
+from pytest import CaptureFixture
+
+from aiocli.commander_app import Application, Command
+from aiocli.commander_cache import CachedResult, CommandCache
+
+
+async def test_application_memoizes_command_results_on_disk(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    calls = []
+    source = tmp_path / 'input.txt'
+    source.write_text('a')
+    app = Application()
+
+    @app.command(
+        name='report',
+        positionals=[('path', {'type': str})],
+        cache=CommandCache(directory=str(tmp_path / 'cache'), files=['path']),
+    )
+    def handle(path: str) -> int:
+        calls.append(path)
+        print('report of', open(path).read())
+        return 0
+
+    assert await app.__call__(['report', str(source)]) == 0
+    assert await app.__call__(['report', str(source)]) == 0
+    assert len(calls) == 1
+    assert capsys.readouterr().out == 'report of a\n' * 2
+
+    source.write_text('b')
+    assert await app.__call__(['report', str(source)]) == 0
+    assert len(calls) == 2
+
+
+async def test_application_captures_the_output_of_concurrent_cached_commands(
+    tmp_path: Path, capsys: CaptureFixture[str]
+) -> None:
+    started = Event()
+    cache = CommandCache(directory=str(tmp_path))
+    app = Application()
+
+    @app.command(name='echo', positionals=[('name', {'type': str})], cache=cache)
+    async def handle(name: str) -> int:
+        print(name, 'start')
+        if name == 'a':
+            await started.wait()
+        else:
+            started.set()
+            await async_sleep(0.01)
+        print(name, 'end')
+        return 0
+
+    stdout = sys.stdout
+    assert await gather(app.__call__(['echo', 'a']), app.__call__(['echo', 'b'])) == [0, 0]
+    assert sys.stdout is stdout
+    capsys.readouterr()
+
+    assert await app.__call__(['echo', 'a']) == 0
+    assert capsys.readouterr().out == 'a start\na end\n'
+    assert await app.__call__(['echo', 'b']) == 0
+    assert capsys.readouterr().out == 'b start\nb end\n'
+
+
+async def test_application_does_not_share_cached_results_between_applications(tmp_path: Path) -> None:
+    cache = CommandCache(directory=str(tmp_path))
+    first, second = Application(title='first'), Application(title='second')
+    calls = []
+
+    @first.command(name='run', cache=cache)
+    def handle_first() -> int:
+        calls.append('first')
+        return 0
+
+    @second.command(name='run', cache=cache)
+    def handle_second() -> int:
+        calls.append('second')
+        return 0
+
+    assert await first.__call__(['run']) == 0
+    assert await second.__call__(['run']) == 0
+    assert calls == ['first', 'second']
+
+
+async def test_application_does_not_cache_failures_answered_by_exception_handlers(tmp_path: Path) -> None:
+    calls = []
+    app = Application()
+
+    @app.exception_handler(typ=ConnectionError)
+    def handle_error(err: ConnectionError, cmd: Command, kwargs: Dict[str, Any]) -> None:
+        print('failed:', err)
+
+    @app.command(name='fetch', cache=CommandCache(directory=str(tmp_path)))
+    def handle() -> int:
+        calls.append('fetch')
+        if len(calls) == 1:
+            raise ConnectionError('network down')
+        return 0
+
+    await app.__call__(['fetch'])
+    assert await app.__call__(['fetch']) == 0
+    assert await app.__call__(['fetch']) == 0
+    assert calls == ['fetch'] * 2
+
+
+def test_command_cache_expires_and_evicts_results(tmp_path: Path) -> None:
+    result = CachedResult(response=0, stdout='x' * 100, stderr='')
+    cache = CommandCache(directory=str(tmp_path), ttl=60, max_size=250)
+    keys = [cache.key('cmd', {'n': n}) for n in range(3)]
+    for key in keys:
+        cache.store(key, result)
+        sleep(0.01)
+
+    assert len(os.listdir(tmp_path)) == 1
+    assert cache.load(keys[-1]) == result
+    assert cache.load(keys[0]) is None
+    assert CommandCache(directory=str(tmp_path), ttl=0).load(keys[-1]) is None
@@ -0,0 +1,49 @@
+from aiocli.commander_app import Application, CommandArgument, command
+from aiocli.commander_completion import complete, completion_script
+from aiocli.commander_manifest import build_manifest
+
+
+def handle() -> int:
+    return 0
+
+
+def create_app() -> Application:
+    calculator = Application(title='calculator')
+    calculator.add_commands(
+        [
+            command(name='div', handler=handle, positionals=[CommandArgument('mode', choices=['int', 'float'])]),
+            command(name='diff', handler=handle),
+        ]
+    )
+    app = Application(
+        commands=[
+            command(
+                name='sort',
+                handler=handle,
+                optionals=[
+                    CommandArgument('--order', choices=['asc', 'desc']),
+                    ('--verbose', {'action': 'store_true'}),
+                ],
+            )
+        ]
+    )
+    app.include_router(calculator, prefix='calculator')
+    return app
+
+
+def test_complete_commands_options_and_choices() -> None:
+    manifest = build_manifest(create_app(), reference='tests.unit.aiocli.test_commander_completion:create_app')
+
+    assert complete(manifest, ['']) == ['calculator', 'sort']
+    assert complete(manifest, ['calculator', 'di']) == ['diff', 'div']
+    assert complete(manifest, ['calculator', 'div', '']) == ['float', 'int']
+    assert complete(manifest, ['sort', '--']) == ['--help', '--order', '--verbose']
+    assert complete(manifest, ['sort', '--order', 'd']) == ['desc']
+    assert complete(manifest, ['sort', '--verbose', '']) == []
+
+
+def test_completion_script_calls_the_completion_module() -> None:
+    script = completion_script('bash', 'my-cli', '/tmp/manifest.json', python='python3')
+
+    assert 'complete -o default -F _my_cli_completion my-cli' in script
+    assert 'python3 -m aiocli.commander_completion complete /tmp/manifest.json --' in script
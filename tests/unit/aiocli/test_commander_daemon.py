@@ -0,0 +1,65 @@
+import os
+import socket
+from asyncio import gather, get_running_loop, sleep
+from json import loads
+from pathlib import Path
+
+from pytest import CaptureFixture
+
+from aiocli.commander_app import Application
+from aiocli.commander_daemon import request_daemon, start_app_server
+
+
+async def test_daemon_executes_requests_concurrently_with_their_own_output(
+    tmp_path: Path, capsys: CaptureFixture[str]
+) -> None:
+    in_flight = {'current': 0, 'max': 0}
+    app = Application()
+
+    @app.command(name='echo', positionals=[('text', {})])
+    async def handle(text: str) -> int:
+        in_flight['current'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['current'])
+        for _ in range(3):
+            print(text)
+            await sleep(0.01)
+        in_flight['current'] -= 1
+        return 0
+
+    path = str(tmp_path / 'daemon.sock')
+    loop = get_running_loop()
+    async with await start_app_server(app, path=path):
+        responses = await gather(
+            *(loop.run_in_executor(None, request_daemon, path, ['echo', text]) for text in ('a', 'b'))
+        )
+
+    assert in_flight['max'] == 2
+    assert [(response.exit_code, response.stdout) for response in responses] == [(0, 'a\n' * 3), (0, 'b\n' * 3)]
+    assert capsys.readouterr().out == ''  # not written by the daemon
+
+
+async def test_daemon_answers_invalid_requests(tmp_path: Path) -> None:
+    app = Application()
+
+    @app.command(name='noop')
+    async def handle() -> int:
+        return 0
+
+    def request(data: bytes) -> bytes:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            sock.sendall(data)
+            return sock.recv(65536)
+
+    path = str(tmp_path / 'daemon.sock')
+    loop = get_running_loop()
+    async with await start_app_server(app, path=path):
+        malformed = loads(await loop.run_in_executor(None, request, b'{"argv": \n'))
+        other_cwd = loads(await loop.run_in_executor(None, request, b'{"argv": ["noop"], "cwd": "/elsewhere"}\n'))
+        valid = loads(
+            await loop.run_in_executor(None, request, b'{"argv": ["noop"], "cwd": "%s"}\n' % os.getcwd().encode())
+        )
+
+    assert malformed['exit_code'] == 1 and 'Invalid request' in malformed['stderr']
+    assert other_cwd['exit_code'] == 1 and 'Invalid cwd' in other_cwd['stderr']
+    assert valid['exit_code'] == 0
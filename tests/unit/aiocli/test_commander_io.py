@@ -0,0 +1,73 @@
+import os
+import sys
+from asyncio import wait_for
+from functools import partial
+from pathlib import Path
+from typing import List
+
+from pytest import MonkeyPatch, raises
+
+from aiocli.commander_app import Application, CommandArgument
+from aiocli.commander_io import AsyncChunks, AsyncLines, memory_map
+
+
+async def test_application_streams_file_arguments_and_closes_them(tmp_path: Path) -> None:
+    path = tmp_path / 'input.txt'
+    path.write_text(''.join(['line {0}\n'.format(n) for n in range(1000)]))
+    streams: List[AsyncLines] = []
+    app = Application(override_return=True)
+
+    @app.command(name='count', positionals=[CommandArgument('source', type=partial(AsyncLines, buffer_size=1024))])
+    async def handle_count(source: AsyncLines) -> int:
+        streams.append(source)
+        return len([line async for line in source])
+
+    @app.command(name='size', positionals=[CommandArgument('source', type=partial(AsyncChunks, chunk_size=1000))])
+    async def handle_size(source: AsyncChunks) -> List[int]:
+        return [len(chunk) async for chunk in source]
+
+    assert await app.__call__(['count', str(path)]) == 1000
+    assert streams[0]._file.closed
+    assert await app.__call__(['size', str(path)]) == [1000] * 8 + [890]
+
+
+async def test_application_streams_stdin_as_it_arrives(monkeypatch: MonkeyPatch) -> None:
+    read_fd, write_fd = os.pipe()
+    stdin = open(read_fd, encoding='utf-8')
+    monkeypatch.setattr(sys, 'stdin', stdin)
+    app = Application(override_return=True)
+
+    @app.command(name='first', positionals=[CommandArgument('source', type=AsyncLines)])
+    async def handle_first(source: AsyncLines) -> str:
+        return await source.__anext__()
+
+    @app.command(name='all', positionals=[CommandArgument('source', type=AsyncLines)])
+    async def handle_all(source: AsyncLines) -> List[str]:
+        return [line async for line in source]
+
+    try:
+        os.write(write_fd, b'hello\r\n')
+        # neither waits for a full buffer or the end of the input, nor for more input when closing
+        assert await wait_for(app.__call__(['first', '-']), timeout=1) == 'hello\n'
+        assert os.get_blocking(read_fd) and not stdin.closed
+        os.write(write_fd, b'world\r\nlast')
+        os.close(write_fd)
+        assert await wait_for(app.__call__(['all', '-']), timeout=1) == ['world\n', 'last']
+    finally:
+        stdin.close()
+
+
+async def test_application_maps_file_arguments_into_memory(tmp_path: Path) -> None:
+    path = tmp_path / 'input.bin'
+    path.write_bytes(b'\x00\x01' * 1024)
+    views: List[memoryview] = []
+    app = Application(override_return=True)
+
+    @app.command(name='sum', positionals=[CommandArgument('source', type=memory_map)])
+    def handle_sum(source: memoryview) -> int:
+        views.append(source)
+        return sum(source)
+
+    assert await app.__call__(['sum', str(path)]) == 1024
+    with raises(ValueError):
+        views[0].tobytes()  # released once the invocation finishes
@@ -0,0 +1,76 @@
+import os
+from pathlib import Path
+
+from pytest import CaptureFixture
+
+from aiocli.commander_app import Application, CommandArgument, command
+from aiocli.commander_manifest import (
+    build_manifest,
+    load_manifest,
+    run_manifest_app,
+    write_manifest,
+)
+
+reference = 'tests.unit.aiocli.test_commander_manifest:create_app'
+
+
+def sort(order: str) -> int:
+    return 0 if order == 'asc' else 1
+
+
+def create_app() -> Application:
+    return Application(
+        title='manifest',
+        version='1.2.3',
+        commands=[
+            command(
+                name='sort',
+                handler=sort,
+                description='Sort things',
+                optionals=[CommandArgument('--order', choices=['asc', 'desc'], default='asc')],
+            ),
+            command(name='lazy', handler='tests.unit.aiocli.lazy_commands:add'),
+        ],
+    )
+
+
+def test_manifest_round_trip_and_staleness(tmp_path: Path) -> None:
+    path = str(tmp_path / 'manifest.json')
+    manifest = build_manifest(create_app(), reference=reference)
+    write_manifest(manifest, path)
+
+    loaded = load_manifest(path)
+
+    assert loaded == manifest
+    assert loaded.resolve_command(['sort']) == manifest.commands['sort']
+    assert manifest.commands['sort'].handler == 'tests.unit.aiocli.test_commander_manifest:sort'
+    assert manifest.commands['lazy'].module == 'tests.unit.aiocli.lazy_commands'
+    assert manifest.commands['sort'].optionals[-1].choices == ['asc', 'desc']
+    assert manifest.version == '1.2.3'
+
+    source = next(iter(manifest.sources))
+    write_manifest(manifest._replace(sources={source: (0, os.stat(source).st_size)}), path)
+    assert load_manifest(path) is None
+
+
+def test_run_manifest_app_answers_help_from_the_manifest(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    path = str(tmp_path / 'manifest.json')
+    manifest = build_manifest(create_app(), reference=reference)
+    write_manifest(manifest._replace(help='from manifest\n'), path)
+
+    assert run_manifest_app(reference, manifest=path, argv=['--help'], exit_code=False) == 0
+    assert capsys.readouterr().out == 'from manifest\n'
+    assert run_manifest_app(reference, manifest=path, argv=['sort', '--order', 'desc'], exit_code=False) == 1
+
+
+def test_run_manifest_app_answers_command_help_without_importing_the_app(
+    tmp_path: Path, capsys: CaptureFixture[str]
+) -> None:
+    path = str(tmp_path / 'manifest.json')
+    manifest = build_manifest(create_app(), reference=reference)
+    assert 'Sort things' in manifest.commands['sort'].help
+    sort_ = manifest.commands['sort']._replace(help='sort from manifest\n')
+    write_manifest(manifest._replace(app='missing.module:app', commands={'sort': sort_}), path)
+
+    assert run_manifest_app('missing.module:app', manifest=path, argv=['sort', '--order', '-h'], exit_code=False) == 0
+    assert capsys.readouterr().out == 'sort from manifest\n'
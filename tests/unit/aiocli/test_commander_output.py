@@ -0,0 +1,88 @@
+from io import BytesIO, StringIO
+from pathlib import Path
+from typing import List
+
+from pytest import CaptureFixture
+
+from aiocli.commander_app import Application, Depends
+from aiocli.commander_output import OutputSink, output_sink
+
+
+class _Output(BytesIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes: List[object] = []
+
+    def write(self, data: object) -> int:
+        self.writes.append(data)
+        return super().write(data)  # type: ignore
+
+
+def test_output_sink_batches_small_writes() -> None:
+    output = _Output()
+    sink = OutputSink(output, buffer_size=10)
+    for _ in range(7):
+        sink.write(b'abc')
+    assert output.writes == [b'abc' * 4] and sink.buffered == 9
+    sink.flush()
+    assert output.getvalue() == b'abc' * 7 and len(output.writes) == 2
+
+
+def test_output_sink_writes_large_buffers_without_copying() -> None:
+    output = _Output()
+    sink = OutputSink(output, buffer_size=4)
+    view = memoryview(b'0123456789')[2:]
+    sink.write(b'ab')
+    sink.write(view)
+    assert output.writes == [b'ab', view] and output.writes[1] is view
+
+
+def test_output_sink_decodes_into_text_streams() -> None:
+    output = StringIO()
+    sink = OutputSink(output)
+    data = 'café\n'.encode()
+    sink.write(data[:4])  # split in the middle of a character
+    sink.write(data[4:])
+    sink.flush()
+    assert output.getvalue() == 'café\n'
+
+
+def test_output_sink_sendfile(tmp_path: Path) -> None:
+    source = tmp_path / 'source'
+    source.write_bytes(b'0123456789' * 1000)
+    with open(tmp_path / 'target', 'wb') as target:
+        sink = OutputSink(target)
+        sink.write(b'head:')
+        assert sink.sendfile(str(source), offset=5, count=20) == 20
+        assert sink.sendfile(str(source)) == 10000
+    assert (tmp_path / 'target').read_bytes() == b'head:' + b'56789012345678901234' + source.read_bytes()
+    output = BytesIO()  # no file descriptor, copied
+    assert OutputSink(output, buffer_size=3).sendfile(str(source), offset=9990) == 10
+    assert output.getvalue() == b'0123456789'
+
+
+async def test_output_sink_asendfile(tmp_path: Path) -> None:
+    source = tmp_path / 'source'
+    source.write_bytes(b'0123456789' * 1000)
+    with open(tmp_path / 'target', 'wb') as target:
+        sink = OutputSink(target)
+        sink.write(b'head:')
+        assert await sink.asendfile(str(source), offset=5, count=20) == 20
+    assert (tmp_path / 'target').read_bytes() == b'head:' + b'56789012345678901234'
+    output = BytesIO()
+    with open(source, 'rb') as file:
+        assert await OutputSink(output).asendfile(file) == 10000
+    assert output.getvalue() == source.read_bytes()
+
+
+async def test_output_sink_dependency(capsys: CaptureFixture[str]) -> None:
+    app = Application()
+
+    @app.command(name='dump')
+    def handle_dump(sink: OutputSink = Depends(output_sink, cache=False)) -> int:
+        print('start')
+        sink.write(b'binary\n')
+        return 0
+
+    assert await app.__call__(['dump']) == 0
+    assert capsys.readouterr().out == 'start\nbinary\n'
@@ -0,0 +1,57 @@
+from io import StringIO
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+from pytest import CaptureFixture, raises
+
+from aiocli.commander_app import Application
+from aiocli.commander_stream import JsonLinesFormatter, stream_records
+
+
+async def test_application_streams_generator_handler_records(capsys: CaptureFixture[str]) -> None:
+    app = Application()
+
+    @app.command(name='users', output_format='csv')
+    async def handle_users() -> AsyncIterator[Dict[str, Any]]:
+        for user_id in range(2):
+            yield {'id': user_id, 'name': 'user {0}'.format(user_id)}
+
+    @app.command(name='numbers', output_format='tsv')
+    def handle_numbers() -> Iterator[List[int]]:
+        yield [1, 2]
+        yield [3, 4]
+
+    assert await app.__call__(['users']) == 0
+    assert capsys.readouterr().out == 'id,name\n0,user 0\n1,user 1\n'
+    assert await app.__call__(['numbers']) == 0
+    assert capsys.readouterr().out == '1\t2\n3\t4\n'
+
+
+async def test_stream_records_pulls_records_as_chunks_are_written() -> None:
+    pulled: List[int] = []
+    writes: List[int] = []
+
+    class Output(StringIO):
+        def write(self, data: str) -> int:
+            writes.append(len(pulled))
+            return super().write(data)
+
+    def records() -> Iterator[Dict[str, int]]:
+        for record in range(100):
+            pulled.append(record)
+            yield {'n': record}
+
+    output = Output()
+    assert await stream_records(records(), JsonLinesFormatter(), output, buffer_size=100) == 100
+    assert output.getvalue().splitlines()[-1] == '{"n": 99}'
+    assert len(writes) > 1 and writes[0] < 100  # written incrementally, not once at the end
+
+
+async def test_stream_records_writes_the_records_yielded_before_a_failure() -> None:
+    def records() -> Iterator[Dict[str, int]]:
+        yield {'n': 1}
+        raise ValueError('failing')
+
+    output = StringIO()
+    with raises(ValueError):
+        await stream_records(records(), JsonLinesFormatter(), output)
+    assert output.getvalue() == '{"n": 1}\n'
@@ -0,0 +1,52 @@
+from logging import DEBUG, Handler, LogRecord, getLogger
+from logging.handlers import QueueHandler
+from typing import List
+
+from aiocli.logger import enable_queue_logging, logger
+
+
+def test_enable_queue_logging_hands_records_over_to_the_given_handlers() -> None:
+    records: List[LogRecord] = []
+
+    class ListHandler(Handler):
+        def emit(self, record: LogRecord) -> None:
+            records.append(record)
+
+    level = logger.level
+    logger.setLevel(DEBUG)
+    listener = enable_queue_logging(ListHandler())
+    try:
+        assert any(isinstance(handler, QueueHandler) for handler in logger.handlers)
+        logger.debug('queued')
+    finally:
+        listener.stop()
+        logger.handlers = [handler for handler in logger.handlers if not isinstance(handler, QueueHandler)]
+        logger.setLevel(level)
+
+    assert [record.getMessage() for record in records] == ['queued']
+
+
+def test_enable_queue_logging_moves_root_handlers_behind_the_queue() -> None:
+    records: List[LogRecord] = []
+
+    class ListHandler(Handler):
+        def emit(self, record: LogRecord) -> None:
+            records.append(record)
+
+    root, handler, handlers = getLogger(), ListHandler(), logger.handlers
+    level = logger.level
+    logger.handlers = []
+    logger.setLevel(DEBUG)
+    root.addHandler(handler)  # e.g. logging.basicConfig
+    try:
+        listener = enable_queue_logging()
+        assert handler in listener.handlers and not logger.propagate
+        logger.debug('queued')
+        listener.stop()
+        assert logger.propagate and logger.handlers == []
+    finally:
+        root.removeHandler(handler)
+        logger.handlers = handlers
+        logger.setLevel(level)
+
+    assert [record.getMessage() for record in records] == ['queued']  # once, not also synchronously by the root